@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Benchmark de lecture des fichiers de stats compressés
+
+Pour chaque format de compression (texte brut, gzip, xz, bz2, zstd), mesure
+sur un gros fichier de stats le débit de la décompression seule (open_stream
+lu par blocs) et celui de PortChecker.check() complet ; l'analyse seule
+(parse_lines sur des lignes déjà en mémoire) est mesurée à part. Les blocs
+sont produits par simulator.generator.render_stats avec des compteurs et des
+dates aléatoires (graine fixe) : le fichier se compresse comme un vrai dump,
+pas comme un bloc répété. Mesure enfin le nombre de membres analysés par
+seconde dans une archive tar.gz.
+
+Usage:
+    python3 benchmarks/bench_compression.py [--size-mb 20] [--members 2000] [--seed 0]
+"""
+
+import argparse
+import bz2
+import gzip
+import io
+import lzma
+import random
+import sys
+import tarfile
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from simulator.generator import PROFILE_OK, render_stats  # noqa: E402
+from src.port_checker import PortChecker, iter_archive, open_stream, parse_lines  # noqa: E402
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+# Taille des blocs lus pour mesurer la décompression seule
+READ_CHUNK = 1024 * 1024
+
+
+def build_payload(size_mb: int, rng: random.Random) -> bytes:
+    """Construit un dump de stats d'environ size_mb Mo, un bloc différent par port"""
+    target = size_mb * 1024 * 1024
+    blocks, size = [], 0
+    while size < target:
+        block = (render_stats(rng, PROFILE_OK) + "\n").encode("utf-8")
+        blocks.append(block)
+        size += len(block)
+    return b"".join(blocks)
+
+
+def codecs():
+    """Retourne les compresseurs disponibles : (nom, suffixe, fonction)"""
+    available = [
+        ("plain", ".txt", lambda data: data),
+        ("gzip", ".gz", lambda data: gzip.compress(data, compresslevel=6)),
+        ("xz", ".xz", lambda data: lzma.compress(data, preset=6)),
+        ("bz2", ".bz2", lambda data: bz2.compress(data, compresslevel=9)),
+    ]
+    if zstandard is not None:
+        available.append(
+            ("zstd", ".zst", lambda data: zstandard.ZstdCompressor(level=3).compress(data))
+        )
+    return available
+
+
+def bench_parse(payload: bytes):
+    """Mesure le débit de parse_lines seul, lignes déjà décodées en mémoire"""
+    lines = payload.decode("utf-8").splitlines(keepends=True)
+    start = time.perf_counter()
+    parse_lines(lines)
+    elapsed = time.perf_counter() - start
+    print(f"analyse seule (parse_lines) : {len(payload) / 1e6 / elapsed:.1f}Mo/s")
+
+
+def read_all(path: Path) -> int:
+    """Décompresse un fichier par blocs sans l'analyser ; retourne la taille lue"""
+    size = 0
+    with open_stream(path) as stream:
+        while chunk := stream.read(READ_CHUNK):
+            size += len(chunk)
+    return size
+
+
+def bench_codecs(workdir: Path, payload: bytes):
+    """Mesure, pour chaque format, la décompression seule puis check() complet"""
+    print(f"Fichier de {len(payload) / 1e6:.1f} Mo décompressés")
+    print(f"{'format':<8} {'taille':>10} {'taux':>7} {'décompression':>15} {'check()':>12}")
+
+    for name, suffix, compress in codecs():
+        path = workdir / f"stats{suffix}"
+        path.write_bytes(compress(payload))
+
+        start = time.perf_counter()
+        assert read_all(path) == len(payload)
+        decompress = time.perf_counter() - start
+
+        start = time.perf_counter()
+        status = PortChecker(path).check()
+        check = time.perf_counter() - start
+
+        assert status.can_restart
+        print(
+            f"{name:<8} {path.stat().st_size / 1e6:>8.2f}Mo "
+            f"{len(payload) / path.stat().st_size:>6.1f}x "
+            f"{len(payload) / 1e6 / decompress:>11.1f}Mo/s "
+            f"{len(payload) / 1e6 / check:>8.1f}Mo/s"
+        )
+
+
+def bench_archive(workdir: Path, members: int, rng: random.Random):
+    """Mesure le nombre de membres analysés par seconde dans un tar.gz"""
+    archive = workdir / "stats.tar.gz"
+    with tarfile.open(archive, "w:gz") as tar:
+        for index in range(members):
+            data = render_stats(rng, PROFILE_OK).encode("utf-8")
+            info = tarfile.TarInfo(f"port_{index}.txt")
+            info.size = len(data)
+            tar.addfile(info, io.BytesIO(data))
+
+    start = time.perf_counter()
+    count = sum(1 for _ in iter_archive(archive))
+    elapsed = time.perf_counter() - start
+    print(f"tar.gz   {count} membres en {elapsed:.3f}s ({count / elapsed:.0f} fichiers/s)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--size-mb", type=int, default=20)
+    parser.add_argument("--members", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    payload = build_payload(args.size_mb, rng)
+    with tempfile.TemporaryDirectory() as tmp:
+        workdir = Path(tmp)
+        bench_codecs(workdir, payload)
+        bench_parse(payload)
+        bench_archive(workdir, args.members, rng)
+
+
+if __name__ == "__main__":
+    main()
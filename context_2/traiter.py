@@ -1,7 +1,17 @@
 #!/usr/bin/env python3
 import pandas as pd
+import numpy as np
+import argparse
+import fcntl
+import os
+import re
 import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from functools import partial
 from datetime import datetime
+from pathlib import Path
 
 # ========== CONFIGURATION ==========
 SEUIL_LATENCE = 200         # ms
@@ -10,6 +20,50 @@ SEUIL_BANDWIDTH_MIN = 10    # Mbps
 
 FICHIER_LOG = "alertes.txt"
 FICHIER_CSV = "donnees_propres.csv"
+FICHIER_RESUME = "resume_sources.csv"
+FICHIER_VERROU = ".traiter.lock"
+
+# Source (sonde / site) d'un fichier : groupe "source" de ce motif, cherché
+# dans le chemin du fichier. Par défaut le nom du fichier sans extension ni
+# suffixe horaire (paris_2025070210.csv → paris) ; modifiable avec
+# --motif-source, par exemple '(?P<source>[^/]+)/[^/]+$' pour le dossier.
+MOTIF_SOURCE = r"(?P<source>[^/]+?)(?:[_-][0-9_-]{6,})?(?:\.\w+)*$"
+
+# Source des lignes écrites avant l'ajout de la colonne source
+SOURCE_HISTORIQUE = "historique"
+
+# Métriques OpenMetrics pour le textfile collector de node_exporter (ou
+# src/metrics.py --include) : mesures par source et durée de l'exécution
+FICHIER_METRIQUES = "metriques_sondes.prom"
+
+# Les séries d'une source non traitée par une exécution sont reprises du
+# fichier précédent tant que sa dernière mise à jour a moins de
+# DUREE_VIE_METRIQUES secondes, et pour au plus MAX_SOURCES_METRIQUES sources
+# (les plus récentes) : le fichier reste borné
+DUREE_VIE_METRIQUES = 24 * 3600
+MAX_SOURCES_METRIQUES = 1000
+
+# Familles de la dernière mesure : une source traitée sans ligne nouvelle
+# (fichier renvoyé, export qui chevauche le précédent) garde ses valeurs
+FAMILLES_MESURES = ("probe_latency_ms", "probe_packet_loss_percent", "probe_bandwidth_mbps")
+
+# Index des lignes déjà sauvegardées : un dossier de niveaux, fichiers de
+# clés triées (entiers 64 bits bruts) fusionnés deux à deux par taille
+DOSSIER_INDEX = "donnees_propres.idx"
+TYPE_CLE = np.dtype("<u8")
+COLONNES_CLE = ['source', 'timestamp', 'bandwidth_mbps', 'latency_ms', 'packet_loss']
+
+# Agrégats par source : fréquence pandas → dossier, un fichier AAAA-MM-JJ.csv
+# par jour pour qu'une exécution ne relise et ne réécrive que les jours touchés
+ROLLUPS = {
+    "1min": "rollup_1min",
+    "5min": "rollup_5min",
+    "1h": "rollup_1h",
+}
+
+# Journal en mémoire : renseigné dans les processus de traitement pour que
+# seul le processus principal écrive dans FICHIER_LOG
+_journal = None
 
 
 # ========== FONCTIONS ==========
@@ -18,91 +72,696 @@ def log(message):
     """Écrit dans le log avec horodatage"""
     heure = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     ligne = f"[{heure}] {message}\n"
-    print(ligne.strip())
-    
+
+    if _journal is not None:
+        _journal.append(ligne)
+        return
+
+    ecrire_journal([ligne])
+
+
+def ecrire_journal(lignes):
+    """Affiche et ajoute des lignes au log en une seule écriture"""
+    for ligne in lignes:
+        print(ligne.strip())
+
     with open(FICHIER_LOG, "a", encoding="utf-8") as f:
-        f.write(ligne)
+        f.write("".join(lignes))
+
+
+@contextmanager
+def verrou():
+    """Verrou exclusif entre instances de traiter.py (écritures des fichiers)"""
+    with open(FICHIER_VERROU, "w") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def source_de(fichier, motif=MOTIF_SOURCE):
+    """Nom de la source (sonde / site) d'un fichier selon motif"""
+    correspondance = re.search(motif, Path(fichier).as_posix())
+    if correspondance is None or not correspondance.group("source"):
+        return Path(fichier).stem
+    return correspondance.group("source")
 
 
 def lire_csv(fichier):
-    """Lit le fichier CSV"""
+    """Lit le fichier CSV (None en cas d'erreur)"""
     try:
         df = pd.read_csv(fichier, skipinitialspace=True)
         log(f"✓ Fichier lu : {len(df)} lignes")
         return df
     except Exception as e:
         log(f"✗ ERREUR lecture : {e}")
-        sys.exit(1)
+        return None
 
 
 def nettoyer(df):
     """Nettoie les données"""
     avant = len(df)
-    
+
     df = df.drop_duplicates()
     df = df.dropna()
-    
+
     df['bandwidth_mbps'] = pd.to_numeric(df['bandwidth_mbps'], errors='coerce')
     df['latency_ms'] = pd.to_numeric(df['latency_ms'], errors='coerce')
     df['packet_loss'] = pd.to_numeric(df['packet_loss'], errors='coerce')
-    
-    df = df[(df['bandwidth_mbps'] >= 0) & 
-            (df['latency_ms'] >= 0) & 
+
+    df = df[(df['bandwidth_mbps'] >= 0) &
+            (df['latency_ms'] >= 0) &
             (df['packet_loss'] >= 0)]
-    
+
     apres = len(df)
     log(f"✓ Nettoyage : {avant} → {apres} lignes")
     return df
 
 
+def masques_anomalies(df):
+    """Retourne un masque booléen par type d'anomalie"""
+    return {
+        "latence": df['latency_ms'] > SEUIL_LATENCE,
+        "perte": df['packet_loss'] > SEUIL_PACKET_LOSS,
+        "bande_passante": df['bandwidth_mbps'] < SEUIL_BANDWIDTH_MIN,
+    }
+
+
 def detecter_anomalies(df):
     """Détecte les anomalies"""
-    anomalies = 0
-    
-    for _, ligne in df.iterrows():
+    masques = masques_anomalies(df)
+    anormales = masques["latence"] | masques["perte"] | masques["bande_passante"]
+    anomalies = int(anormales.sum())
+
+    # Seules les lignes anormales sont parcourues pour construire les alertes
+    for index, ligne in df[anormales].iterrows():
         problemes = []
-        
-        if ligne['latency_ms'] > SEUIL_LATENCE:
+
+        if masques["latence"][index]:
             problemes.append(f"Latence {ligne['latency_ms']}ms")
-        
-        if ligne['packet_loss'] > SEUIL_PACKET_LOSS:
+
+        if masques["perte"][index]:
             problemes.append(f"Perte {ligne['packet_loss']}%")
-        
-        if ligne['bandwidth_mbps'] < SEUIL_BANDWIDTH_MIN:
+
+        if masques["bande_passante"][index]:
             problemes.append(f"Bande passante {ligne['bandwidth_mbps']} Mbps")
-        
-        if problemes:
-            log(f"⚠ ALERTE {ligne['timestamp']} : {', '.join(problemes)}")
-            anomalies += 1
-    
+
+        log(f"⚠ ALERTE {ligne['timestamp']} : {', '.join(problemes)}")
+
     if anomalies == 0:
         log("✓ Aucune anomalie")
     else:
         log(f"⚠ {anomalies} anomalie(s) détectée(s)")
-    
+
     return df
 
 
+def cles_lignes(df):
+    """
+    Clé de 64 bits de chaque ligne (hash des COLONNES_CLE)
+
+    Les mesures sont converties en float pour que 90 et 90.0 donnent la même
+    clé d'une exécution à l'autre.
+    """
+    cle = df[COLONNES_CLE].astype({
+        'source': str,
+        'timestamp': str,
+        'bandwidth_mbps': 'float64',
+        'latency_ms': 'float64',
+        'packet_loss': 'float64',
+    })
+    return pd.util.hash_pandas_object(cle, index=False).to_numpy(dtype=np.uint64)
+
+
+def niveaux_index():
+    """Fichiers de niveau de l'index, du plus ancien (le plus grand) au plus récent"""
+    if not os.path.isdir(DOSSIER_INDEX):
+        return []
+    return sorted(
+        os.path.join(DOSSIER_INDEX, nom) for nom in os.listdir(DOSSIER_INDEX)
+        if nom.startswith("niveau-") and nom.endswith(".u64")
+    )
+
+
+def charger_niveau(chemin):
+    """Clés triées d'un niveau, projetées en mémoire (vide s'il a disparu)"""
+    try:
+        if os.path.getsize(chemin) == 0:
+            return np.empty(0, dtype=TYPE_CLE)
+        return np.memmap(chemin, dtype=TYPE_CLE, mode='r')
+    except FileNotFoundError:
+        # Fusionné entre-temps par une autre instance : revérifié sous verrou
+        return np.empty(0, dtype=TYPE_CLE)
+
+
+def deja_vues(cles):
+    """
+    Indique, pour chaque clé, si elle est déjà dans l'index
+
+    Recherche dichotomique dans chaque niveau projeté en mémoire : les niveaux
+    doublant de taille, il y en a O(log n) et le coût dépend du nombre de
+    nouvelles lignes, pas de la taille de l'historique.
+    """
+    vues = np.zeros(len(cles), dtype=bool)
+    for chemin in niveaux_index():
+        index = charger_niveau(chemin)
+        if len(index) == 0:
+            continue
+        positions = np.minimum(np.searchsorted(index, cles), len(index) - 1)
+        vues |= index[positions] == cles
+    return vues
+
+
+def fusionner_niveaux(ancien, recent, taille_bloc=1 << 20):
+    """
+    Fusionne le niveau recent dans le niveau ancien, par blocs de clés
+
+    Au plus 2 × taille_bloc clés en mémoire, quelle que soit la taille des
+    niveaux. Le résultat remplace ancien (renommage), puis recent est
+    supprimé : une interruption entre les deux laisse des clés en double,
+    sans effet sur les recherches.
+    """
+    a, b = charger_niveau(ancien), charger_niveau(recent)
+    temporaire = ancien + ".tmp"
+    i = j = 0
+    with open(temporaire, "wb") as f:
+        while i < len(a) or j < len(b):
+            bornes = [x[k + taille_bloc - 1] for x, k in ((a, i), (b, j))
+                      if k + taille_bloc <= len(x)]
+            if bornes:
+                fin_a = int(np.searchsorted(a, min(bornes), side='right'))
+                fin_b = int(np.searchsorted(b, min(bornes), side='right'))
+            else:
+                fin_a, fin_b = len(a), len(b)
+            np.union1d(a[i:fin_a], b[j:fin_b]).astype(TYPE_CLE).tofile(f)
+            i, j = fin_a, fin_b
+    os.replace(temporaire, ancien)
+    os.remove(recent)
+
+
+def enregistrer_cles(cles):
+    """
+    Ajoute des clés à l'index dans un nouveau niveau
+
+    Tant que l'avant-dernier niveau fait moins du double du dernier, les deux
+    sont fusionnés : chaque clé est réécrite O(log n) fois au total, et une
+    exécution ne réécrit en général que de petits niveaux récents.
+    """
+    cles = np.unique(cles)
+    if len(cles) == 0:
+        return
+    os.makedirs(DOSSIER_INDEX, exist_ok=True)
+    niveaux = niveaux_index()
+    numero = int(os.path.basename(niveaux[-1])[7:15]) + 1 if niveaux else 0
+    chemin = os.path.join(DOSSIER_INDEX, f"niveau-{numero:08d}.u64")
+    cles.astype(TYPE_CLE).tofile(chemin + ".tmp")
+    os.replace(chemin + ".tmp", chemin)
+
+    niveaux.append(chemin)
+    while len(niveaux) >= 2 and os.path.getsize(niveaux[-2]) < 2 * os.path.getsize(niveaux[-1]):
+        fusionner_niveaux(niveaux[-2], niveaux[-1])
+        niveaux.pop()
+
+
+def dedupliquer(df):
+    """Retire les lignes déjà sauvegardées lors d'exécutions précédentes"""
+    nouvelles = ~deja_vues(cles_lignes(df))
+    doublons = len(df) - int(nouvelles.sum())
+    if doublons:
+        log(f"✓ Doublons de l'historique : {doublons} ligne(s) ignorée(s)")
+    return df[nouvelles]
+
+
+def analyser(df, source):
+    """Nettoie, attribue la source et retire les lignes déjà sauvegardées"""
+    df = nettoyer(df).assign(source=source)
+    return dedupliquer(df)
+
+
+def colonnes_historique():
+    """Colonnes de FICHIER_CSV (None s'il n'existe pas ou est vide)"""
+    if not os.path.exists(FICHIER_CSV) or os.path.getsize(FICHIER_CSV) == 0:
+        return None
+    return list(pd.read_csv(FICHIER_CSV, nrows=0).columns)
+
+
+def migrer_historique(taille_bloc=1_000_000):
+    """
+    Ajoute la colonne source à un FICHIER_CSV écrit sans elle
+
+    Les lignes existantes reçoivent SOURCE_HISTORIQUE. Réécriture par blocs,
+    valeurs lues comme du texte pour les recopier à l'identique, dans un
+    fichier temporaire renommé ensuite. Appelé sous verrou.
+
+    Returns:
+        Les colonnes de FICHIER_CSV après migration (None s'il n'existe pas)
+    """
+    colonnes = colonnes_historique()
+    if colonnes is None or 'source' in colonnes:
+        return colonnes
+
+    temporaire = f"{FICHIER_CSV}.{os.getpid()}.tmp"
+    pd.DataFrame(columns=colonnes + ['source']).to_csv(temporaire, index=False)
+    lignes = 0
+    for bloc in pd.read_csv(FICHIER_CSV, dtype=str, keep_default_na=False,
+                            chunksize=taille_bloc):
+        bloc.assign(source=SOURCE_HISTORIQUE).to_csv(
+            temporaire, mode='a', header=False, index=False
+        )
+        lignes += len(bloc)
+    os.replace(temporaire, FICHIER_CSV)
+    log(f"✓ {FICHIER_CSV} migré : colonne source ajoutée ({lignes} ligne(s) "
+        f"en source {SOURCE_HISTORIQUE})")
+    return colonnes + ['source']
+
+
 def sauvegarder(df):
-    """Sauvegarde en CSV"""
-    import os
-    mode = 'a' if os.path.exists(FICHIER_CSV) else 'w'
-    df.to_csv(FICHIER_CSV, mode=mode, header=(mode == 'w'), index=False)
+    """
+    Sauvegarde en CSV les lignes absentes de l'index, puis les indexe
+
+    Appelé sous verrou : l'index est revérifié ici pour écarter les doublons
+    entre fichiers d'un même lot et ceux écrits entre-temps par une autre
+    instance. Les lignes sont écrites dans l'ordre des colonnes de l'en-tête
+    existant (migré au besoin) ; les colonnes qu'il ne connaît pas sont
+    ignorées.
+
+    Returns:
+        Le DataFrame des lignes effectivement sauvegardées
+    """
+    cles = cles_lignes(df)
+    doublons_lot = pd.Series(cles).duplicated().to_numpy()
+    if doublons_lot.any():
+        log(f"✓ Doublons du lot : {int(doublons_lot.sum())} ligne(s) ignorée(s)")
+    nouvelles = ~deja_vues(cles) & ~doublons_lot
+    df, cles = df[nouvelles], cles[nouvelles]
+
+    colonnes = migrer_historique()
+    if colonnes is None:
+        df.to_csv(FICHIER_CSV, index=False)
+    else:
+        df.reindex(columns=colonnes).to_csv(FICHIER_CSV, mode='a', header=False, index=False)
+    enregistrer_cles(cles)
     log(f"✓ Sauvegardé dans {FICHIER_CSV}")
+    return df
+
+
+def reconstruire_index(taille_bloc=1_000_000):
+    """
+    Reconstruit l'index à partir de FICHIER_CSV, par blocs de lignes
+
+    Appelé sous verrou, après migrer_historique. Les clés déjà indexées par
+    un bloc précédent (lignes en double dans l'historique) sont écartées :
+    les niveaux restent disjoints.
+    """
+    if os.path.isdir(DOSSIER_INDEX):
+        for nom in os.listdir(DOSSIER_INDEX):
+            os.remove(os.path.join(DOSSIER_INDEX, nom))
+    lignes = 0
+    for bloc in pd.read_csv(FICHIER_CSV, chunksize=taille_bloc):
+        cles = np.unique(cles_lignes(bloc))
+        enregistrer_cles(cles[~deja_vues(cles)])
+        lignes += len(bloc)
+    log(f"✓ Index reconstruit : {lignes} lignes de {FICHIER_CSV}")
+
+
+def agreger(df, frequence):
+    """
+    Agrège les mesures par source et par intervalle de temps
+
+    Returns:
+        Un DataFrame avec une ligne par (source, timestamp de début d'intervalle)
+    """
+    horodatage = pd.to_datetime(df['timestamp'], errors='coerce')
+    df = df.assign(timestamp=horodatage.dt.floor(frequence)).dropna(subset=['timestamp'])
+    groupes = df.groupby(['source', 'timestamp'])
+
+    rollup = groupes.agg(
+        samples=('latency_ms', 'size'),
+        latency_min=('latency_ms', 'min'),
+        latency_mean=('latency_ms', 'mean'),
+        latency_max=('latency_ms', 'max'),
+        packet_loss_mean=('packet_loss', 'mean'),
+        bandwidth_min=('bandwidth_mbps', 'min'),
+    )
+    rollup['latency_p95'] = groupes['latency_ms'].quantile(0.95)
+
+    rollup = rollup.reset_index()
+    rollup['timestamp'] = rollup['timestamp'].dt.strftime("%Y-%m-%d %H:%M:%S")
+    return rollup
+
+
+def fusionner_rollups(ancien, nouveau):
+    """
+    Fusionne deux tables d'agrégats (intervalles communs recombinés)
+
+    Moyennes pondérées par le nombre d'échantillons, min/max exacts. Le p95
+    n'est pas recombinable : pour un intervalle présent des deux côtés, on
+    garde le plus grand des deux (borne haute).
+    """
+    tout = pd.concat([ancien, nouveau], ignore_index=True)
+    tout['latency_sum'] = tout['latency_mean'] * tout['samples']
+    tout['packet_loss_sum'] = tout['packet_loss_mean'] * tout['samples']
+
+    fusion = tout.groupby(['source', 'timestamp'], as_index=False).agg(
+        samples=('samples', 'sum'),
+        latency_min=('latency_min', 'min'),
+        latency_sum=('latency_sum', 'sum'),
+        latency_max=('latency_max', 'max'),
+        packet_loss_sum=('packet_loss_sum', 'sum'),
+        bandwidth_min=('bandwidth_min', 'min'),
+        latency_p95=('latency_p95', 'max'),
+    )
+    fusion['latency_mean'] = fusion['latency_sum'] / fusion['samples']
+    fusion['packet_loss_mean'] = fusion['packet_loss_sum'] / fusion['samples']
+    return fusion[list(nouveau.columns)]
+
+
+def mettre_a_jour_rollups(df, reconstruire=False):
+    """
+    Met à jour les tables d'agrégats avec les nouvelles mesures
+
+    Seuls les fichiers des jours touchés par df sont relus, fusionnés et
+    réécrits (fichier temporaire renommé) : le coût dépend des nouvelles
+    mesures, pas de l'historique. Les rapports lisent ces petites tables au
+    lieu de réagréger FICHIER_CSV.
+    """
+    jours = set()
+    for frequence, dossier in ROLLUPS.items():
+        if reconstruire and os.path.isdir(dossier):
+            for nom in os.listdir(dossier):
+                os.remove(os.path.join(dossier, nom))
+        os.makedirs(dossier, exist_ok=True)
+
+        rollup = agreger(df, frequence)
+        for jour, partie in rollup.groupby(rollup['timestamp'].str[:10]):
+            fichier = os.path.join(dossier, f"{jour}.csv")
+            if not reconstruire and os.path.exists(fichier):
+                partie = fusionner_rollups(pd.read_csv(fichier), partie)
+            temporaire = f"{fichier}.{os.getpid()}.tmp"
+            partie.sort_values(['source', 'timestamp']).to_csv(temporaire, index=False)
+            os.replace(temporaire, fichier)
+            jours.add(jour)
+    log(f"✓ Agrégats mis à jour : {len(jours)} jour(s) dans {', '.join(ROLLUPS.values())}")
+
+
+def resumer(source, fichiers, lues, df):
+    """Résumé des anomalies d'une source (une ligne de FICHIER_RESUME)"""
+    masques = masques_anomalies(df)
+    anormales = masques["latence"] | masques["perte"] | masques["bande_passante"]
+    return {
+        "source": source,
+        "fichiers": fichiers,
+        "lignes_lues": lues,
+        "lignes_propres": len(df),
+        "anomalies": int(anormales.sum()),
+        "alertes_latence": int(masques["latence"].sum()),
+        "alertes_perte": int(masques["perte"].sum()),
+        "alertes_bande_passante": int(masques["bande_passante"].sum()),
+    }
+
+
+def traiter_fichier(fichier, motif=MOTIF_SOURCE):
+    """
+    Lit, nettoie et analyse un fichier dans un processus de traitement
+
+    Aucune écriture : le journal et les données propres sont renvoyés au
+    processus principal, seul écrivain de FICHIER_LOG et FICHIER_CSV, qui
+    détecte les anomalies sur les lignes effectivement sauvegardées.
+
+    Returns:
+        (lignes du journal, DataFrame nettoyé ou None, (source, lignes lues))
+    """
+    global _journal
+    _journal = []
+    source = source_de(fichier, motif)
+    try:
+        log(f"--- {fichier} (source {source}) ---")
+        df = lire_csv(fichier)
+        if df is None:
+            return _journal, None, (source, 0)
+
+        lues = len(df)
+        try:
+            df = analyser(df, source)
+        except Exception as e:
+            log(f"✗ ERREUR traitement : {e!r}")
+            return _journal, None, (source, lues)
+        return _journal, df, (source, lues)
+    finally:
+        _journal = None
+
+
+def enregistrer_lot(propres, lectures):
+    """
+    Sauvegarde un lot, puis alerte et résume à partir des lignes sauvegardées
+
+    Appelé sous verrou. Les doublons entre fichiers du lot sont écartés par
+    sauvegarder avant toute alerte : une ligne présente dans deux fichiers
+    n'est signalée et comptée qu'une fois.
+
+    Args:
+        propres: DataFrames nettoyés des fichiers lus
+        lectures: (source, lignes lues) de chaque fichier lu
+
+    Returns:
+        (dernière mesure de chaque source ou None, résumés par source)
+    """
+    if propres:
+        df = pd.concat(propres, ignore_index=True)
+        dernieres = dernieres_mesures(df)
+        df = sauvegarder(df)
+        detecter_anomalies(df)
+        mettre_a_jour_rollups(df)
+    else:
+        df, dernieres = None, None
+
+    par_source = {}
+    for source, lues in lectures:
+        fichiers, total = par_source.get(source, (0, 0))
+        par_source[source] = (fichiers + 1, total + lues)
+    resumes = [
+        resumer(source, fichiers, lues, df[df['source'] == source])
+        for source, (fichiers, lues) in par_source.items()
+    ]
+    return dernieres, resumes
+
+
+def traiter_fichiers(fichiers, workers=None, motif=MOTIF_SOURCE):
+    """
+    Traite plusieurs fichiers en parallèle puis écrit les résultats une fois
+
+    Returns:
+        Le nombre de fichiers illisibles
+    """
+    debut = time.perf_counter()
+    dossiers = {}
+    for fichier in fichiers:
+        dossiers.setdefault(source_de(fichier, motif), set()).add(os.path.dirname(fichier))
+    for source, chemins in sorted(dossiers.items()):
+        if len(chemins) > 1:
+            log(f"⚠ Source {source} : fichiers de {len(chemins)} dossiers regroupés "
+                f"(voir --motif-source)")
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        resultats = list(pool.map(partial(traiter_fichier, motif=motif), fichiers))
+
+    journal = [ligne for lignes, _, _ in resultats for ligne in lignes]
+    propres = [df for _, df, _ in resultats if df is not None]
+    lectures = [lecture for _, df, lecture in resultats if df is not None]
+
+    echecs = sum(1 for _, df, _ in resultats if df is None)
+    with verrou():
+        ecrire_journal(journal)
+        dernieres, resumes = enregistrer_lot(propres, lectures)
+        if resumes:
+            sauvegarder_resume(resumes)
+        ecrire_metriques(resumes, dernieres, time.perf_counter() - debut, len(fichiers), echecs)
+
+    return echecs
+
+
+def dernieres_mesures(df):
+    """Dernière mesure de chaque source (timestamp 'AAAA-MM-JJ HH:MM:SS' triable)"""
+    return df.sort_values('timestamp').groupby('source').tail(1)
+
+
+def echantillons_precedents(sources, mesurees, maintenant):
+    """
+    Échantillons probe_* du fichier de métriques à reprendre tels quels
+
+    Une exécution ne traite souvent qu'une source (surveiller.sh) : les
+    mesures des autres sources sont reprises du fichier précédent, sauf
+    celles dont probe_last_update_timestamp_seconds a expiré (voir
+    DUREE_VIE_METRIQUES et MAX_SOURCES_METRIQUES). Les FAMILLES_MESURES
+    d'une source traitée sont aussi reprises si elle n'a aucune ligne
+    nouvelle (absente de mesurees).
+    """
+    lignes = []
+    mises_a_jour = {}
+    if not os.path.exists(FICHIER_METRIQUES):
+        return {}
+    with open(FICHIER_METRIQUES, encoding="utf-8") as f:
+        for ligne in f:
+            if not ligne.startswith("probe_"):
+                continue
+            nom, _, reste = ligne.partition("{")
+            source = reste.partition('source="')[2].partition('"')[0]
+            if source in (mesurees if nom in FAMILLES_MESURES else sources):
+                continue
+            lignes.append((nom, source, ligne.rstrip("\n")))
+            if nom == "probe_last_update_timestamp_seconds":
+                try:
+                    mises_a_jour[source] = float(ligne.rpartition(" ")[2])
+                except ValueError:
+                    pass
+
+    recentes = sorted(
+        (horodatage, source) for source, horodatage in mises_a_jour.items()
+        if maintenant - horodatage < DUREE_VIE_METRIQUES
+    )[-MAX_SOURCES_METRIQUES:]
+    gardees = {source for _, source in recentes} | set(sources)
+
+    echantillons = {}
+    for nom, source, ligne in lignes:
+        if source in gardees:
+            echantillons.setdefault(nom, []).append(ligne)
+    return echantillons
+
+
+def ecrire_metriques(resumes, dernieres, duree, fichiers, echecs):
+    """
+    Écrit les métriques de l'exécution dans FICHIER_METRIQUES
+
+    Appelé sous verrou ; écriture dans un fichier temporaire puis
+    renommage, node_exporter ne lit jamais un fichier à moitié écrit.
+    """
+    resume = pd.DataFrame(resumes).groupby("source", as_index=False).sum() if resumes else None
+    sources = set(resume["source"]) if resume is not None else set()
+    maintenant = round(datetime.now().timestamp(), 3)
+    mesurees = set(dernieres["source"]) if dernieres is not None else set()
+    precedents = echantillons_precedents(sources, mesurees, maintenant)
+
+    def etiquette(valeur):
+        return str(valeur).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+    familles = []
+
+    def famille(nom, aide, echantillons):
+        echantillons = precedents.get(nom, []) + echantillons
+        if echantillons:
+            familles.append([f"# TYPE {nom} gauge", f"# HELP {nom} {aide}", *echantillons])
+
+    def par_source(tableau, colonne, **etiquettes):
+        if tableau is None:
+            return []
+        extra = "".join(f',{cle}="{valeur}"' for cle, valeur in etiquettes.items())
+        return [f'{{source="{etiquette(source)}"{extra}}} {valeur}'
+                for source, valeur in zip(tableau["source"], tableau[colonne])]
+
+    for nom, colonne, aide in (
+        ("probe_rows_read", "lignes_lues", "Lignes lues à la dernière exécution"),
+        ("probe_rows_clean", "lignes_propres", "Lignes propres à la dernière exécution"),
+        ("probe_anomalies", "anomalies", "Lignes anormales à la dernière exécution"),
+    ):
+        famille(nom, aide, [nom + e for e in par_source(resume, colonne)])
+
+    famille("probe_alerts", "Alertes par type à la dernière exécution", [
+        "probe_alerts" + e
+        for type_alerte in ("latence", "perte", "bande_passante")
+        for e in par_source(resume, f"alertes_{type_alerte}", type=type_alerte)
+    ])
+
+    famille("probe_last_update_timestamp_seconds", "Dernière exécution ayant traité la source", [
+        f'probe_last_update_timestamp_seconds{{source="{etiquette(source)}"}} {maintenant}'
+        for source in sorted(sources)
+    ])
+
+    for nom, colonne, aide in (
+        ("probe_latency_ms", "latency_ms", "Dernière latence mesurée (ms)"),
+        ("probe_packet_loss_percent", "packet_loss", "Dernière perte de paquets mesurée (%)"),
+        ("probe_bandwidth_mbps", "bandwidth_mbps", "Dernière bande passante mesurée (Mbps)"),
+    ):
+        famille(nom, aide, [nom + e for e in par_source(dernieres, colonne)])
+
+    for nom, valeur, aide in (
+        ("traiter_run_seconds", round(duree, 3), "Durée de la dernière exécution (s)"),
+        ("traiter_run_files", fichiers, "Fichiers traités par la dernière exécution"),
+        ("traiter_run_failed_files", echecs, "Fichiers illisibles à la dernière exécution"),
+        ("traiter_run_timestamp_seconds", maintenant, "Fin de la dernière exécution"),
+    ):
+        famille(nom, aide, [f"{nom} {valeur}"])
+
+    temporaire = f"{FICHIER_METRIQUES}.{os.getpid()}.tmp"
+    with open(temporaire, "w", encoding="utf-8") as f:
+        f.write("".join("\n".join(lignes) + "\n" for lignes in familles))
+    os.replace(temporaire, FICHIER_METRIQUES)
+    log(f"✓ Métriques dans {FICHIER_METRIQUES}")
+
+
+def sauvegarder_resume(resumes):
+    """Agrège les résumés par source, les journalise et les écrit en CSV"""
+    resume = pd.DataFrame(resumes).groupby("source", as_index=False).sum()
+
+    for ligne in resume.itertuples(index=False):
+        log(f"• {ligne.source} : {ligne.fichiers} fichier(s), "
+            f"{ligne.lignes_propres} ligne(s), {ligne.anomalies} anomalie(s)")
+
+    resume.to_csv(FICHIER_RESUME, index=False)
+    log(f"✓ Résumé par source dans {FICHIER_RESUME}")
 
 
 # ========== MAIN ==========
 
 if __name__ == "__main__":
-    if len(sys.argv) < 2:
-        print("Usage: python3 traiter.py fichier.csv")
-        sys.exit(1)
-    
-    fichier = sys.argv[1]
-    
+    parser = argparse.ArgumentParser(
+        description="Nettoie des fichiers CSV de mesures réseau et détecte les anomalies"
+    )
+    parser.add_argument("fichiers", nargs="*", metavar="fichier.csv")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="processus de traitement (défaut : nombre de CPU)")
+    parser.add_argument("--motif-source", default=MOTIF_SOURCE,
+                        help="expression régulière dont le groupe 'source' est cherché "
+                             "dans le chemin de chaque fichier")
+    parser.add_argument("--reconstruire-rollups", action="store_true",
+                        help=f"recalcule les agrégats exacts à partir de {FICHIER_CSV}")
+    parser.add_argument("--reconstruire-index", action="store_true",
+                        help=f"reconstruit l'index de dédoublonnage à partir de {FICHIER_CSV}")
+    args = parser.parse_args()
+    if not (args.fichiers or args.reconstruire_rollups or args.reconstruire_index):
+        parser.error("au moins un fichier CSV est requis")
+    try:
+        if "source" not in re.compile(args.motif_source).groupindex:
+            parser.error("--motif-source doit contenir un groupe (?P<source>...)")
+    except re.error as e:
+        parser.error(f"--motif-source invalide : {e}")
+
     log("=== DÉBUT ===")
-    df = lire_csv(fichier)
-    df = nettoyer(df)
-    df = detecter_anomalies(df)
-    sauvegarder(df)
-    log("=== FIN ===\n")
\ No newline at end of file
+    if args.reconstruire_rollups or args.reconstruire_index:
+        with verrou():
+            # Un historique d'avant la colonne source est d'abord migré
+            if migrer_historique() is None:
+                log(f"✗ {FICHIER_CSV} absent : rien à reconstruire")
+                sys.exit(1)
+            if args.reconstruire_index:
+                reconstruire_index()
+            if args.reconstruire_rollups:
+                mettre_a_jour_rollups(pd.read_csv(FICHIER_CSV), reconstruire=True)
+        echecs = 0
+    elif len(args.fichiers) == 1:
+        debut = time.perf_counter()
+        with verrou():
+            df = lire_csv(args.fichiers[0])
+            if df is None:
+                ecrire_metriques([], None, time.perf_counter() - debut, 1, 1)
+                sys.exit(1)
+            source, lues = source_de(args.fichiers[0], args.motif_source), len(df)
+            dernieres, resumes = enregistrer_lot([analyser(df, source)], [(source, lues)])
+            ecrire_metriques(resumes, dernieres, time.perf_counter() - debut, 1, 0)
+        echecs = 0
+    else:
+        echecs = traiter_fichiers(args.fichiers, args.workers, args.motif_source)
+        if echecs:
+            log(f"✗ {echecs} fichier(s) illisible(s)")
+    log("=== FIN ===\n")
+    sys.exit(1 if echecs else 0)
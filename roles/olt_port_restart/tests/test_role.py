@@ -70,9 +70,24 @@ class TestRoleStructure:
         assert host.file(f"{role_path}/meta/main.yml").exists
     
     def test_role_files_exist(self, host, role_path):
-        """Test : Les fichiers Python doivent être présents"""
-        assert host.file(f"{role_path}/files/port_checker.py").exists
-        assert host.file(f"{role_path}/files/check_port_cli.py").exists
+        """Test : Le bundle du CLI et ses variables doivent être présents"""
+        assert host.file(f"{role_path}/files/check_port.pyz").exists
+        assert host.file(f"{role_path}/vars/main.yml").exists
+
+    def test_role_has_no_duplicated_sources(self, host, role_path):
+        """Test : Le rôle ne doit plus embarquer de copie des sources"""
+        assert not host.file(f"{role_path}/files/port_checker.py").exists
+        assert not host.file(f"{role_path}/files/check_port_cli.py").exists
+
+    def test_bundle_up_to_date(self, host, project_root):
+        """Test : Le bundle du rôle doit correspondre aux sources de src/"""
+        cmd = host.run(f"python3 {project_root}/scripts/build_bundle.py --check")
+        assert cmd.rc == 0, cmd.stderr
+
+    def test_bundle_hash_stamp(self, host, role_path):
+        """Test : L'empreinte de vars/main.yml doit être celle du bundle"""
+        bundle = host.file(f"{role_path}/files/check_port.pyz")
+        assert f'olt_bundle_sha256: "{bundle.sha256sum}"' in host.file(f"{role_path}/vars/main.yml").content_string
     
     def test_meta_syntax(self, host, role_path):
         """Test : Le fichier meta doit être du YAML valide"""
@@ -128,6 +143,34 @@ class TestRoleExecution:
         
         host.run("rm -f /tmp/test_role_fail.yml")
     
+    def test_role_skips_copy_when_bundle_present(self, host, fixtures_path, project_root):
+        """Test : Le bundle ne doit pas être recopié s'il est déjà à jour"""
+        playbook = f"""
+---
+- hosts: localhost
+  gather_facts: no
+  roles:
+    - role: {project_root}/roles/olt_port_restart
+      stats_file: /tmp/test_stats_ok.txt
+      olt: test-olt
+      olt_port: 1/1/1
+      skip_restart: true
+      temp_dir: /tmp/test_role_bundle
+"""
+        host.run(f"echo '{playbook}' > /tmp/test_role_bundle.yml")
+
+        first = host.run("ansible-playbook /tmp/test_role_bundle.yml")
+        second = host.run("ansible-playbook /tmp/test_role_bundle.yml")
+
+        assert first.rc == 0, f"Playbook failed: {first.stdout}"
+        assert second.rc == 0, f"Playbook failed: {second.stdout}"
+        assert "Copier le bundle du CLI] ***" in second.stdout
+        copy_task = second.stdout.split("Copier le bundle du CLI]", 1)[1]
+        assert copy_task.split("TASK [", 1)[0].count("skipping:") == 1
+        assert "changed=0" in second.stdout
+
+        host.run("rm -rf /tmp/test_role_bundle.yml /tmp/test_role_bundle")
+
     def test_role_without_required_vars(self, host, project_root):
         """Test : Le rôle doit échouer sans variables requises"""
         playbook = f"""
@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+"""
+Construit le CLI de vérification sous forme de zipapp autonome
+
+Le zipapp contient port_checker, check_port_cli et metrics, en source (.py) et
+précompilés (.pyc, hash non vérifié) : l'interpréteur de la même version
+n'a rien à compiler au démarrage, les autres versions se rabattent sur les
+sources. La construction est déterministe (dates fixes, ordre fixe).
+
+Le code source canonique est dans src/. Avec --role, le zipapp est écrit
+dans le rôle Ansible avec un fichier vars/main.yml qui porte sa version et
+ses empreintes : le rôle ne recopie le bundle que si l'empreinte distante
+diffère. Toute modification des sources embarquées doit s'accompagner d'un
+changement de __version__ (src/__init__.py) : --role refuse sinon de
+reconstruire, et --check le signale.
+
+Usage:
+    python3 scripts/build_bundle.py [--output dist/check_port.pyz]
+    python3 scripts/build_bundle.py --role     # met à jour le rôle
+    python3 scripts/build_bundle.py --check    # vérifie que le rôle est à jour
+"""
+
+import argparse
+import hashlib
+import importlib.util
+import py_compile
+import re
+import sys
+import tempfile
+import zipfile
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+SOURCE_DIR = PROJECT_ROOT / "src"
+ROLE_DIR = PROJECT_ROOT / "roles" / "olt_port_restart"
+ROLE_BUNDLE = ROLE_DIR / "files" / "check_port.pyz"
+ROLE_VARS = ROLE_DIR / "vars" / "main.yml"
+
+# Modules embarqués, dans l'ordre d'écriture dans l'archive
+MODULES = ("port_checker", "check_port_cli", "metrics")
+
+MAIN_SOURCE = "import check_port_cli\ncheck_port_cli.main()\n"
+SHEBANG = b"#!/usr/bin/env python3\n"
+
+# Date fixe pour que deux constructions donnent les mêmes octets
+ZIP_DATE = (1980, 1, 1, 0, 0, 0)
+
+
+ROLE_VARS_TEMPLATE = """\
+---
+# Généré par scripts/build_bundle.py --role : ne pas modifier à la main
+
+# Version du code embarqué (src/__init__.py)
+olt_bundle_version: "{version}"
+
+# Empreinte SHA-256 de files/check_port.pyz
+olt_bundle_sha256: "{bundle_sha256}"
+
+# Empreinte SHA-256 des sources embarquées (détection de dérive)
+olt_bundle_source_sha256: "{source_sha256}"
+"""
+
+
+def read_version(source_dir: Path = SOURCE_DIR) -> str:
+    """Lit __version__ dans src/__init__.py sans importer le package"""
+    content = (source_dir / "__init__.py").read_text(encoding="utf-8")
+    match = re.search(r'^__version__\s*=\s*"([^"]+)"', content, re.MULTILINE)
+    if not match:
+        raise ValueError(f"__version__ introuvable dans {source_dir / '__init__.py'}")
+    return match.group(1)
+
+
+def source_digest(source_dir: Path = SOURCE_DIR) -> str:
+    """
+    Empreinte des sources embarquées
+
+    Indépendante de la version de Python, contrairement aux .pyc : c'est elle
+    qui sert à détecter un bundle désynchronisé de src/.
+    """
+    digest = hashlib.sha256(read_version(source_dir).encode("utf-8"))
+    for name in MODULES:
+        digest.update(name.encode("utf-8"))
+        digest.update((source_dir / f"{name}.py").read_bytes())
+    return digest.hexdigest()
+
+
+def _compile(name: str, source: bytes, workdir: Path) -> bytes:
+    """Compile un module en .pyc basé sur un hash non vérifié"""
+    source_path = workdir / f"{name}.py"
+    pyc_path = workdir / f"{name}.pyc"
+    source_path.write_bytes(source)
+    py_compile.compile(
+        str(source_path),
+        cfile=str(pyc_path),
+        dfile=f"{name}.py",
+        doraise=True,
+        invalidation_mode=py_compile.PycInvalidationMode.UNCHECKED_HASH,
+    )
+    return pyc_path.read_bytes()
+
+
+def bundle_entries(source_dir: Path = SOURCE_DIR):
+    """
+    Retourne les entrées de l'archive : liste de (nom, contenu)
+
+    Les .pyc portent le magic number de l'interpréteur courant
+    (importlib.util.MAGIC_NUMBER) ; zipimport les ignore s'il diffère.
+    """
+    entries = []
+    with tempfile.TemporaryDirectory() as tmp:
+        workdir = Path(tmp)
+        for name in MODULES:
+            source = (source_dir / f"{name}.py").read_bytes()
+            entries.append((f"{name}.py", source))
+            entries.append((f"{name}.pyc", _compile(name, source, workdir)))
+        entries.append(("__main__.py", MAIN_SOURCE.encode("utf-8")))
+    return entries
+
+
+def write_bundle(output: Path, entries) -> Path:
+    """Écrit le zipapp exécutable de façon déterministe"""
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, "wb") as f:
+        f.write(SHEBANG)
+        with zipfile.ZipFile(f, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+            for name, data in entries:
+                info = zipfile.ZipInfo(name, date_time=ZIP_DATE)
+                info.compress_type = zipfile.ZIP_DEFLATED
+                info.external_attr = 0o644 << 16
+                zf.writestr(info, data)
+    output.chmod(0o755)
+    return output
+
+
+def file_digest(path: Path) -> str:
+    """Empreinte SHA-256 d'un fichier"""
+    return hashlib.sha256(path.read_bytes()).hexdigest()
+
+
+def read_role_vars(vars_file: Path = ROLE_VARS) -> dict:
+    """Lit les variables générées du rôle (format clé: "valeur")"""
+    if not vars_file.exists():
+        return {}
+    content = vars_file.read_text(encoding="utf-8")
+    return dict(re.findall(r'^(\w+):\s*"([^"]*)"', content, re.MULTILINE))
+
+
+def version_not_bumped(role_vars: dict, source_dir: Path = SOURCE_DIR) -> bool:
+    """Vrai si les sources embarquées ont changé sans changer __version__"""
+    return (
+        role_vars.get("olt_bundle_version") == read_version(source_dir)
+        and role_vars.get("olt_bundle_source_sha256") != source_digest(source_dir)
+    )
+
+
+def build_role(bundle: Path = ROLE_BUNDLE, vars_file: Path = ROLE_VARS,
+               source_dir: Path = SOURCE_DIR) -> dict:
+    """
+    Construit le bundle du rôle et écrit ses variables d'empreinte
+
+    Raises:
+        ValueError: Si les sources ont changé depuis la dernière construction
+            sans que __version__ ait changé
+    """
+    if version_not_bumped(read_role_vars(vars_file), source_dir):
+        raise ValueError(
+            f"sources de src/ modifiées sans changer __version__ ({read_version(source_dir)})"
+        )
+    write_bundle(bundle, bundle_entries(source_dir))
+    stamp = {
+        "version": read_version(source_dir),
+        "bundle_sha256": file_digest(bundle),
+        "source_sha256": source_digest(source_dir),
+    }
+    vars_file.parent.mkdir(parents=True, exist_ok=True)
+    vars_file.write_text(ROLE_VARS_TEMPLATE.format(**stamp), encoding="utf-8")
+    return stamp
+
+
+def check_role(bundle: Path = ROLE_BUNDLE, vars_file: Path = ROLE_VARS,
+               source_dir: Path = SOURCE_DIR) -> list:
+    """
+    Vérifie que le bundle du rôle correspond aux sources de src/
+
+    Returns:
+        La liste des problèmes détectés (vide si le rôle est à jour)
+    """
+    role_vars = read_role_vars(vars_file)
+    if not bundle.exists() or not role_vars:
+        return ["bundle ou vars/main.yml absent"]
+
+    problems = []
+    if role_vars.get("olt_bundle_version") != read_version(source_dir):
+        problems.append("version différente de src/__init__.py")
+    if version_not_bumped(role_vars, source_dir):
+        problems.append("sources de src/ modifiées sans changer __version__")
+    elif role_vars.get("olt_bundle_source_sha256") != source_digest(source_dir):
+        problems.append("sources de src/ modifiées depuis la construction")
+    if role_vars.get("olt_bundle_sha256") != file_digest(bundle):
+        problems.append("empreinte du bundle différente de vars/main.yml")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--output", type=Path, default=PROJECT_ROOT / "dist" / "check_port.pyz"
+    )
+    parser.add_argument("--role", action="store_true",
+                        help="construit le bundle du rôle olt_port_restart")
+    parser.add_argument("--check", action="store_true",
+                        help="vérifie que le bundle du rôle est à jour")
+    args = parser.parse_args()
+
+    if args.check:
+        problems = check_role()
+        for problem in problems:
+            print(f"Bundle du rôle obsolète : {problem}", file=sys.stderr)
+        if problems:
+            if version_not_bumped(read_role_vars()):
+                print("Changer __version__ dans src/__init__.py", file=sys.stderr)
+            print("Relancer : python3 scripts/build_bundle.py --role", file=sys.stderr)
+            sys.exit(1)
+        print(f"Bundle du rôle à jour ({read_version()})")
+        return
+
+    if args.role:
+        try:
+            stamp = build_role()
+        except ValueError as e:
+            print(f"Bundle non construit : {e}", file=sys.stderr)
+            print("Changer __version__ dans src/__init__.py puis relancer", file=sys.stderr)
+            sys.exit(1)
+        print(f"{ROLE_BUNDLE} v{stamp['version']} sha256 {stamp['bundle_sha256']}")
+        return
+
+    output = write_bundle(args.output, bundle_entries())
+    print(f"{output} (python {sys.version_info.major}.{sys.version_info.minor}, "
+          f"magic {importlib.util.MAGIC_NUMBER.hex()})")
+
+
+if __name__ == "__main__":
+    main()
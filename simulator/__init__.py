@@ -0,0 +1,7 @@
+"""
+Simulateur d'OLT pour les tests de charge locaux
+
+- generator : génère un parc de fichiers de stats (sortie dig) réalistes
+- fake_oltchiprzt : faux oltchiprzt.pl avec latence et taux d'échec réglables
+- loadtest : mesure le débit de bout en bout sur un parc généré
+"""
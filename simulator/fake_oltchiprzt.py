@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Faux oltchiprzt.pl pour les tests de charge
+
+Accepte la même ligne de commande que le vrai script (-h <olt> -p <port>),
+attend une latence réglable puis réussit ou échoue selon un taux donné.
+Chaque appel peut être journalisé (une ligne "olt port rc durée").
+
+Usage:
+    fake_oltchiprzt.py [--latency 0.2] [--jitter 0.05] [--failure-rate 0.01] \
+        [--log appels.log] [--seed N] -h <olt> -p <port>
+
+Avec Ansible :
+    -e "olt_restart_command='python3 simulator/fake_oltchiprzt.py --latency 0.1'"
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+# Code de retour d'un redémarrage simulé en échec
+EXIT_FAILURE = 2
+
+
+def parse_args(argv=None):
+    """Analyse la ligne de commande (-h est l'OLT, comme dans oltchiprzt.pl)"""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1], add_help=False)
+    parser.add_argument("-h", dest="olt", required=True, help="OLT")
+    parser.add_argument("-p", dest="port", required=True, help="port")
+    parser.add_argument("--latency", type=float, default=0.0, help="latence moyenne (secondes)")
+    parser.add_argument("--jitter", type=float, default=0.0, help="écart maximal autour de la latence")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="proportion d'échecs (0 à 1)")
+    parser.add_argument("--log", help="fichier où journaliser les appels")
+    parser.add_argument("--seed", type=int, help="graine (tirages reproductibles)")
+    return parser.parse_args(argv)
+
+
+def restart(args) -> int:
+    """Simule le redémarrage et retourne le code de sortie"""
+    rng = random.Random(args.seed)
+    delay = max(0.0, args.latency + rng.uniform(-args.jitter, args.jitter))
+    start = time.perf_counter()
+    time.sleep(delay)
+    rc = EXIT_FAILURE if rng.random() < args.failure_rate else 0
+    elapsed = time.perf_counter() - start
+
+    if args.log:
+        # O_APPEND : une ligne par appel, même avec des appels concurrents
+        line = f"{args.olt} {args.port} {rc} {elapsed:.4f}\n".encode("utf-8")
+        fd = os.open(args.log, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+        try:
+            os.write(fd, line)
+        finally:
+            os.close(fd)
+    return rc
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    rc = restart(args)
+    if rc == 0:
+        print(f"Port redemarre: -h {args.olt} -p {args.port}")
+    else:
+        print(f"Erreur : redemarrage refuse par {args.olt} pour {args.port}", file=sys.stderr)
+    sys.exit(rc)
+
+
+if __name__ == "__main__":
+    main()
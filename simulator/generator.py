@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Génération d'un parc d'OLT simulé
+
+Écrit un fichier de stats par port, au format de la sortie dig, et un CSV
+olt,port,stats_file,expected utilisable tel quel par check_port_cli.py
+--batch et par les playbooks de parc. La colonne expected donne le
+reason_code attendu (0 OK, 1 PON Power FAIL, 2 ratio bas, 3 slice hors
+ligne) : un test de charge peut vérifier les décisions, pas seulement le
+débit.
+
+Usage:
+    python3 -m simulator.generator /tmp/parc --olts 100 --ports-per-olt 1000 \
+        [--pon-fail 0.02] [--ratio-low 0.05] [--offline 0.01] [--seed 0]
+"""
+
+import argparse
+import csv
+import random
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# Profils de port, numérotés comme PortStatus.reason_code
+PROFILE_OK = 0
+PROFILE_PON_FAIL = 1
+PROFILE_RATIO_LOW = 2
+PROFILE_OFFLINE = 3
+
+# Proportions par défaut des ports bloqués
+DEFAULT_PON_FAIL = 0.02
+DEFAULT_RATIO_LOW = 0.05
+DEFAULT_OFFLINE = 0.01
+
+# Ports PON par carte : le port n devient 1/<carte>/<pon>
+PONS_PER_SLOT = 16
+
+# Instant de référence des dates "ONLINE depuis"
+REFERENCE_DATE = datetime(2025, 6, 15, 9, 40, 40)
+
+STATS_TEMPLATE = (
+    "* Stats:\n"
+    "    * Port: NNI-Link UP - PON-Power {pon_power}\n"
+    "    * Nb clients: {nb_clients}\n"
+    "    * MpcpPortRegister: {req} REQ - {ack} ACK\n"
+    "    * Slice: {slice_status} depuis {since}\n"
+    "    * Compteurs: rx={rx} tx={tx} err={err} drop={drop}"
+)
+
+
+def choose_profile(rng: random.Random, pon_fail: float, ratio_low: float, offline: float) -> int:
+    """Tire le profil d'un port selon les proportions demandées"""
+    draw = rng.random()
+    if draw < pon_fail:
+        return PROFILE_PON_FAIL
+    if draw < pon_fail + ratio_low:
+        return PROFILE_RATIO_LOW
+    if draw < pon_fail + ratio_low + offline:
+        return PROFILE_OFFLINE
+    return PROFILE_OK
+
+
+def render_stats(rng: random.Random, profile: int) -> str:
+    """Produit la sortie dig d'un port du profil donné"""
+    req = rng.randint(50, 5000)
+    if profile == PROFILE_RATIO_LOW:
+        # Ratio entre 50 % et 94 %, strictement sous le seuil de 95 %
+        ack = int(req * rng.uniform(0.50, 0.94))
+    else:
+        ack = req - int(req * rng.uniform(0.0, 0.04))
+
+    since = REFERENCE_DATE - timedelta(seconds=rng.randint(0, 90 * 86400))
+    return STATS_TEMPLATE.format(
+        pon_power="FAIL" if profile == PROFILE_PON_FAIL else "GOOD",
+        nb_clients=rng.randint(1, 64),
+        req=req,
+        ack=ack,
+        slice_status="OFFLINE" if profile == PROFILE_OFFLINE else "ONLINE",
+        since=since.strftime("%Y-%m-%d %H:%M:%S"),
+        rx=rng.randint(0, 10**10),
+        tx=rng.randint(0, 10**10),
+        err=rng.randint(0, 50),
+        drop=rng.randint(0, 50),
+    )
+
+
+def port_name(index: int) -> str:
+    """Nom du port d'index donné (0 → 1/1/1, 16 → 1/2/1)"""
+    return f"1/{index // PONS_PER_SLOT + 1}/{index % PONS_PER_SLOT + 1}"
+
+
+def generate_fleet(
+    output_dir,
+    olts: int,
+    ports_per_olt: int,
+    pon_fail: float = DEFAULT_PON_FAIL,
+    ratio_low: float = DEFAULT_RATIO_LOW,
+    offline: float = DEFAULT_OFFLINE,
+    seed: int = 0,
+) -> Path:
+    """
+    Génère un parc complet dans output_dir
+
+    Args:
+        output_dir: Dossier de sortie (créé au besoin)
+        olts: Nombre d'OLT
+        ports_per_olt: Nombre de ports par OLT
+        pon_fail, ratio_low, offline: Proportions de chaque cause de blocage
+        seed: Graine du générateur (même graine, même parc)
+
+    Returns:
+        Chemin du CSV olt,port,stats_file,expected
+
+    Raises:
+        ValueError: Si les proportions sont négatives ou dépassent 1 au total
+    """
+    if min(pon_fail, ratio_low, offline) < 0 or pon_fail + ratio_low + offline > 1:
+        raise ValueError("Les proportions doivent être positives et de somme ≤ 1")
+
+    rng = random.Random(seed)
+    output_dir = Path(output_dir).resolve()
+    csv_path = output_dir / "fleet.csv"
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    with open(csv_path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(("olt", "port", "stats_file", "expected"))
+
+        for olt_index in range(olts):
+            olt = f"olt-sim-{olt_index + 1:04d}"
+            olt_dir = output_dir / "stats" / olt
+            olt_dir.mkdir(parents=True, exist_ok=True)
+
+            for port_index in range(ports_per_olt):
+                profile = choose_profile(rng, pon_fail, ratio_low, offline)
+                port = port_name(port_index)
+                stats_path = olt_dir / f"{port.replace('/', '_')}.txt"
+                stats_path.write_text(render_stats(rng, profile), encoding="utf-8")
+                writer.writerow((olt, port, stats_path, profile))
+
+    return csv_path
+
+
+def read_expected(csv_path) -> dict:
+    """Lit les décisions attendues d'un parc généré : (olt, port) → reason_code"""
+    with open(csv_path, newline="", encoding="utf-8") as f:
+        return {(row["olt"], row["port"]): int(row["expected"]) for row in csv.DictReader(f)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("output_dir", help="dossier du parc généré")
+    parser.add_argument("--olts", type=int, default=10)
+    parser.add_argument("--ports-per-olt", type=int, default=100)
+    parser.add_argument("--pon-fail", type=float, default=DEFAULT_PON_FAIL)
+    parser.add_argument("--ratio-low", type=float, default=DEFAULT_RATIO_LOW)
+    parser.add_argument("--offline", type=float, default=DEFAULT_OFFLINE)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    try:
+        csv_path = generate_fleet(
+            args.output_dir, args.olts, args.ports_per_olt,
+            args.pon_fail, args.ratio_low, args.offline, args.seed,
+        )
+    except (OSError, ValueError) as e:
+        print(f"Erreur : {e}", file=sys.stderr)
+        sys.exit(1)
+    print(csv_path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+"""
+Test de charge de bout en bout sur un parc simulé
+
+Génère un parc (ou réutilise un CSV de simulator.generator), puis mesure :
+- checker  : PortChecker dans un seul processus (débit d'analyse pur)
+- batch    : check_port_cli.py --batch --compact, un appel par OLT, en
+             parallèle (chemin des playbooks de parc)
+- restart  : faux oltchiprzt.pl sur les ports autorisés, en parallèle
+- playbook : restart_fleet.yml complet avec le faux oltchiprzt.pl (option
+             --playbook ; Ansible ne tient pas 100k ports, viser ~1000)
+
+Les décisions sont comparées à la colonne expected du CSV ; le rapport JSON
+donne le débit (ports/s) et le nombre d'écarts de chaque étape.
+
+Usage:
+    python3 -m simulator.loadtest --olts 100 --ports-per-olt 1000 [--workers 8]
+    python3 -m simulator.loadtest --fleet /tmp/parc/fleet.csv --playbook
+"""
+
+import argparse
+import csv
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import groupby
+from pathlib import Path
+
+from simulator import generator
+from src.port_checker import PortChecker
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+CLI = PROJECT_ROOT / "src" / "check_port_cli.py"
+FAKE_RESTART = PROJECT_ROOT / "simulator" / "fake_oltchiprzt.py"
+FLEET_PLAYBOOK = PROJECT_ROOT / "playbooks" / "restart_fleet.yml"
+
+
+def read_fleet(csv_path) -> list:
+    """Lit le CSV du parc : liste de dicts olt, port, stats_file, expected"""
+    with open(csv_path, newline="", encoding="utf-8") as f:
+        return list(csv.DictReader(f))
+
+
+def stage_report(ports: int, elapsed: float, mismatches: int = 0, **extra) -> dict:
+    """Résumé d'une étape : durée, débit et écarts avec les décisions attendues"""
+    report = {
+        "ports": ports,
+        "seconds": round(elapsed, 3),
+        "ports_per_second": round(ports / elapsed, 1) if elapsed else None,
+        "mismatches": mismatches,
+    }
+    report.update(extra)
+    return report
+
+
+def run_checker(rows: list) -> dict:
+    """Étape checker : analyse de tous les fichiers dans ce processus"""
+    mismatches = 0
+    start = time.perf_counter()
+    for row in rows:
+        status = PortChecker(row["stats_file"]).check()
+        if status.reason_code != int(row["expected"]):
+            mismatches += 1
+    return stage_report(len(rows), time.perf_counter() - start, mismatches)
+
+
+def check_olt(cli, olt_rows: list) -> list:
+    """Lance le CLI --batch --compact pour les ports d'une OLT"""
+    lines = ["olt,port,stats_file"] + [f"{r['olt']},{r['port']},{r['stats_file']}" for r in olt_rows]
+    cmd = subprocess.run(
+        [sys.executable, str(cli), "--batch", "-", "--compact"],
+        input="\n".join(lines) + "\n",
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    output = json.loads(cmd.stdout)
+    return [dict(zip(output["fields"], record)) for record in output["records"]]
+
+
+def run_batch(rows: list, workers: int, cli=CLI) -> tuple:
+    """
+    Étape batch : un appel du CLI par OLT, workers appels simultanés
+
+    Returns:
+        (rapport de l'étape, ports autorisés)
+    """
+    expected = {(r["olt"], r["port"]): int(r["expected"]) for r in rows}
+    by_olt = [list(group) for _, group in groupby(rows, key=lambda row: row["olt"])]
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = [record for records in pool.map(lambda group: check_olt(cli, group), by_olt)
+                   for record in records]
+    elapsed = time.perf_counter() - start
+
+    mismatches = sum(1 for r in results if r["reason_code"] != expected[(r["olt"], r["port"])])
+    approved = [r for r in results if r["can_restart"]]
+    report = stage_report(len(results), elapsed, mismatches, cli_calls=len(by_olt), workers=workers,
+                          approved=len(approved))
+    return report, approved
+
+
+def restart_port(record: dict, options: list, log_path) -> int:
+    """Lance le faux oltchiprzt.pl pour un port"""
+    cmd = subprocess.run(
+        [sys.executable, str(FAKE_RESTART), *options, "--log", str(log_path),
+         "-h", record["olt"], "-p", record["port"]],
+        capture_output=True,
+    )
+    return cmd.returncode
+
+
+def run_restart(approved: list, workers: int, options: list, workdir: Path, limit: int) -> dict:
+    """Étape restart : redémarrages simulés des ports autorisés"""
+    approved = approved[:limit]
+    log_path = workdir / "restarts.log"
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        codes = list(pool.map(lambda record: restart_port(record, options, log_path), approved))
+    elapsed = time.perf_counter() - start
+
+    return stage_report(len(approved), elapsed, workers=workers,
+                        failed=sum(1 for rc in codes if rc != 0))
+
+
+def run_playbook(fleet_csv, options: list, workdir: Path) -> dict:
+    """Étape playbook : restart_fleet.yml avec le faux oltchiprzt.pl"""
+    report_path = workdir / "fleet_report.json"
+    restart_command = " ".join([sys.executable, str(FAKE_RESTART), *options])
+
+    start = time.perf_counter()
+    cmd = subprocess.run(
+        [
+            "ansible-playbook", str(FLEET_PLAYBOOK),
+            "-e", f"fleet_csv={fleet_csv}",
+            "-e", f"olt_restart_command='{restart_command}'",
+            "-e", f"fleet_report_file={report_path}",
+            "-e", f"temp_dir={workdir / 'bundle'}",
+        ],
+        capture_output=True,
+        text=True,
+        stdin=subprocess.DEVNULL,
+    )
+    elapsed = time.perf_counter() - start
+
+    if cmd.returncode != 0:
+        return {"rc": cmd.returncode, "seconds": round(elapsed, 3), "error": cmd.stdout[-2000:]}
+    summary = json.loads(report_path.read_text(encoding="utf-8"))["summary"]
+    return stage_report(summary["ports"], elapsed, restarted=summary["restarted"],
+                        olts_failed=summary["olts_failed"])
+
+
+def restart_options(args) -> list:
+    """Options transmises au faux oltchiprzt.pl"""
+    return ["--latency", str(args.latency), "--jitter", str(args.jitter),
+            "--failure-rate", str(args.failure_rate)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--fleet", help="CSV d'un parc déjà généré (sinon un parc est généré)")
+    parser.add_argument("--workdir", help="dossier de travail (défaut : dossier temporaire)")
+    parser.add_argument("--olts", type=int, default=100)
+    parser.add_argument("--ports-per-olt", type=int, default=1000)
+    parser.add_argument("--pon-fail", type=float, default=generator.DEFAULT_PON_FAIL)
+    parser.add_argument("--ratio-low", type=float, default=generator.DEFAULT_RATIO_LOW)
+    parser.add_argument("--offline", type=float, default=generator.DEFAULT_OFFLINE)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="appels du CLI simultanés (défaut : nombre de CPU)")
+    parser.add_argument("--cli", default=str(CLI), help="CLI à mesurer (source ou check_port.pyz)")
+    parser.add_argument("--latency", type=float, default=0.05, help="latence du faux oltchiprzt.pl")
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--restart-workers", type=int, default=32)
+    parser.add_argument("--restart-limit", type=int, default=1000,
+                        help="nombre maximal de redémarrages simulés (défaut : 1000)")
+    parser.add_argument("--skip-checker", action="store_true")
+    parser.add_argument("--playbook", action="store_true", help="mesurer aussi restart_fleet.yml")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="olt-loadtest-") as tmp:
+        workdir = Path(args.workdir or tmp)
+        workdir.mkdir(parents=True, exist_ok=True)
+
+        report = {}
+        try:
+            if args.fleet:
+                fleet_csv = Path(args.fleet).resolve()
+            else:
+                start = time.perf_counter()
+                fleet_csv = generator.generate_fleet(
+                    workdir / "fleet", args.olts, args.ports_per_olt,
+                    args.pon_fail, args.ratio_low, args.offline, args.seed,
+                )
+                report["generate"] = {"seconds": round(time.perf_counter() - start, 3)}
+            rows = read_fleet(fleet_csv)
+        except (OSError, ValueError, KeyError) as e:
+            print(json.dumps({"message": f"Erreur : {str(e)}"}, ensure_ascii=False))
+            sys.exit(1)
+
+        report["fleet"] = {"csv": str(fleet_csv), "ports": len(rows),
+                           "olts": len({row["olt"] for row in rows})}
+        if not args.skip_checker:
+            report["checker"] = run_checker(rows)
+        report["batch"], approved = run_batch(rows, args.workers, args.cli)
+        report["restart"] = run_restart(approved, args.restart_workers, restart_options(args),
+                                        workdir, args.restart_limit)
+        if args.playbook:
+            report["playbook"] = run_playbook(fleet_csv, restart_options(args), workdir)
+
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    failed = any(stage.get("mismatches") for stage in report.values())
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
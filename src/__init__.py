@@ -0,0 +1,5 @@
+"""
+Automatisation de redémarrage de ports OLT
+"""
+
+__version__ = "1.1.7"
@@ -2,92 +2,348 @@
 """
 Script CLI pour vérifier l'état d'un port OLT
 Version universelle qui fonctionne partout
+
+Le script est lancé une fois par port par Ansible : le démarrage à froid
+domine. Aucune manipulation de sys.path, et PortChecker n'est importé
+qu'au moment de l'analyse.
+
+Usage:
+    check_port_cli.py [--format json|msgpack] [--metrics-file f.prom] <fichier_stats>
+    check_port_cli.py [--format json|msgpack] [--metrics-file f.prom] --batch <ports.csv|-> \
+        [--compact] [--only-blocked]
+
+Le mode --batch prend un CSV avec les colonnes olt,port,stats_file. Un
+stats_file relatif est résolu par rapport au dossier du CSV (par rapport au
+dossier courant quand le CSV est lu sur l'entrée standard avec -).
+--compact remplace chaque résultat par un tableau (voir COMPACT_FIELDS) et
+--only-blocked ne retourne que les ports dont le redémarrage est bloqué :
+utilisés sur l'hôte qui détient les stats, ils réduisent ce qui remonte au
+contrôleur à quelques dizaines d'octets par port.
+
+Les sorties suivent schemas/port_check_result.v1.json : chaque résultat
+porte schema_version et un reason_code numérique stable à côté du message
+en français. Le JSON est encodé avec orjson s'il est installé, json sinon
+(mêmes octets ; un objet qu'orjson refuse passe par json) ; --format
+msgpack produit du MessagePack.
+
+--metrics-file écrit en plus l'état de chaque port et la durée de
+l'exécution au format OpenMetrics, pour le textfile collector de
+node_exporter (voir src/metrics.py).
 """
 
 import sys
-import json
-from pathlib import Path
+import time
+
+# Version du schéma de sortie (schemas/port_check_result.v<N>.json)
+SCHEMA_VERSION = 1
+
+# Codes d'erreur du CLI ; 0 à 6 sont les codes de PortStatus.reason_code
+ERROR_USAGE = 10
+ERROR_FILE_NOT_FOUND = 11
+ERROR_IMPORT = 12
+ERROR_UNEXPECTED = 13
+ERROR_BATCH_INPUT = 14
+ERROR_FORMAT = 15
+
+OK_MESSAGE = "OK - Toutes les conditions sont remplies"
+
+# Colonnes obligatoires du CSV du mode --batch
+BATCH_COLUMNS = {"olt", "port", "stats_file"}
 
-# Stratégie d'import intelligente
-def import_port_checker():
+# Options du mode --batch
+BATCH_OPTIONS = {"--compact", "--only-blocked"}
+
+# Formats de sortie acceptés par --format
+FORMATS = ("json", "msgpack")
+
+# Ordre des champs d'un résultat compact (can_restart vaut 0 ou 1, error
+# n'est renseigné que si le fichier n'a pas pu être analysé ; nb_clients,
+# ajouté en dernier, sert au classement par impact de correlation.py)
+COMPACT_FIELDS = (
+    "olt", "port", "can_restart", "pon_power", "ack", "req", "slice_status", "error", "reason_code",
+    "nb_clients",
+)
+
+USAGE = (
+    "Usage: check_port_cli.py [--format json|msgpack] [--metrics-file f.prom] <fichier_stats> "
+    "| --batch <ports.csv|-> [--compact] [--only-blocked]"
+)
+
+
+def load_port_checker():
     """Importe PortChecker depuis le bon endroit selon le contexte"""
-    
-    # Essai 1 : Import depuis le même dossier (contexte rôle Ansible)
-    sys.path.insert(0, str(Path(__file__).parent))
+
     try:
+        # Contexte package (import src.check_port_cli)
+        from .port_checker import PortChecker
+    except ImportError:
+        # Contexte script, rôle Ansible ou zipapp : le dossier (ou l'archive)
+        # du script est déjà en tête de sys.path
         from port_checker import PortChecker
-        return PortChecker
+    return PortChecker
+
+
+def load_metrics():
+    """Importe le module metrics (uniquement avec --metrics-file)"""
+
+    try:
+        from . import metrics
     except ImportError:
-        pass
-    
-    # Essai 2 : Import depuis src/ (contexte développement)
-    sys.path.insert(0, str(Path(__file__).parent.parent))
+        import metrics
+    return metrics
+
+
+def write_metrics(path, results, started):
+    """
+    Écrit les métriques d'une exécution pour le textfile collector
+
+    Une erreur d'écriture est signalée sur stderr sans changer la sortie
+    ni le code retour : les métriques ne doivent pas bloquer un contrôle.
+    """
+    try:
+        metrics = load_metrics()
+        registry = metrics.MetricsRegistry()
+        metrics.record_port_results(registry, results)
+        metrics.record_run(registry, "check_port_cli", time.perf_counter() - started, results)
+        metrics.write_textfile(registry, path)
+    except (OSError, ImportError) as e:
+        print(f"Erreur : métriques non écrites : {e}", file=sys.stderr)
+
+
+def load_encoder(output_format: str = "json"):
+    """
+    Choisit une fois pour toutes l'encodeur de la sortie
+
+    Args:
+        output_format: "json" ou "msgpack"
+
+    Returns:
+        Une fonction objet → octets ; le JSON se termine par un saut de ligne
+
+    Raises:
+        ImportError: Si msgpack est demandé mais pas installé
+    """
+    if output_format == "msgpack":
+        import msgpack
+        return msgpack.Packer(use_bin_type=True).pack
+
+    def encode_json(obj) -> bytes:
+        import json
+        return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8") + b"\n"
+
     try:
-        from src.port_checker import PortChecker
-        return PortChecker
+        import orjson
     except ImportError:
-        pass
-    
-    # Essai 3 : Import absolu (contexte package installé)
+        return encode_json
+
+    def encode(obj) -> bytes:
+        try:
+            return orjson.dumps(obj, option=orjson.OPT_APPEND_NEWLINE)
+        except TypeError:
+            # Entier de plus de 64 bits, type inconnu... : json les accepte
+            return encode_json(obj)
+    return encode
+
+
+def emit(encode, result):
+    """Écrit un résultat encodé sur la sortie standard"""
+    sys.stdout.flush()
+    sys.stdout.buffer.write(encode(result))
+    sys.stdout.buffer.flush()
+
+
+def error_result(reason_code: int, message: str) -> dict:
+    """Construit le résultat d'une erreur (usage, fichier absent...)"""
+    return {
+        "schema_version": SCHEMA_VERSION,
+        "can_restart": False,
+        "reason_code": reason_code,
+        "message": message
+    }
+
+
+def port_result(status) -> dict:
+    """Construit le résultat d'un port à partir de PortStatus.to_dict()"""
+    result = status.to_dict()
+    result["message"] = result.pop("block_reason") or OK_MESSAGE
+    result["schema_version"] = SCHEMA_VERSION
+    return result
+
+
+def check_batch(source, PortChecker, base_dir: str = "") -> list:
+    """
+    Vérifie une liste de ports décrite en CSV, en un seul processus
+
+    Args:
+        source: Fichier texte CSV avec les colonnes olt, port, stats_file
+        PortChecker: Classe de vérification (voir load_port_checker)
+        base_dir: Dossier des stats_file relatifs ("" : dossier courant)
+
+    Returns:
+        Un résultat par ligne, dans l'ordre du CSV
+
+    Raises:
+        ValueError: Si une colonne obligatoire manque dans l'en-tête (une ligne
+            au mauvais nombre de colonnes donne un résultat en erreur)
+    """
+    import csv
+    import os
+
+    reader = csv.DictReader(source)
+    missing = BATCH_COLUMNS - set(reader.fieldnames or ())
+    if missing:
+        raise ValueError(f"Colonnes manquantes : {', '.join(sorted(missing))}")
+
+    results = []
+    for row in reader:
+        result = {"olt": row["olt"], "port": row["port"], "stats_file": row["stats_file"]}
+        # Ligne trop courte (valeurs None) ou trop longue (clé None) : erreur
+        # sur cette ligne seulement, le reste du lot est vérifié
+        if None in row or None in result.values():
+            result.update(error_result(
+                ERROR_BATCH_INPUT,
+                f"Erreur : ligne {reader.line_num} du CSV : {len(reader.fieldnames)} colonnes attendues"
+            ))
+            results.append(result)
+            continue
+        try:
+            stats_file = os.path.join(base_dir, row["stats_file"])
+            result.update(port_result(PortChecker(stats_file, validate=True).check()))
+        except FileNotFoundError as e:
+            result.update(error_result(ERROR_FILE_NOT_FOUND, f"Erreur : {str(e)}"))
+        except Exception as e:
+            result.update(error_result(ERROR_UNEXPECTED, f"Erreur inattendue : {str(e)}"))
+        results.append(result)
+    return results
+
+
+def compact_result(result: dict) -> list:
+    """Réduit un résultat du mode --batch à un tableau ordonné (COMPACT_FIELDS)"""
+    error = None if "pon_power" in result else result["message"]
+    return [
+        result["olt"],
+        result["port"],
+        int(result["can_restart"]),
+        result.get("pon_power"),
+        result.get("ack", 0),
+        result.get("req", 0),
+        result.get("slice_status"),
+        error,
+        result["reason_code"],
+        result.get("nb_clients"),
+    ]
+
+
+def main_batch(csv_path, options=(), encode=None, metrics_file=None, started=None):
+    """Mode --batch : vérifie tous les ports d'un CSV (ou de stdin avec -)"""
+    import os
+
+    encode = encode or load_encoder()
+    started = started or time.perf_counter()
     try:
-        from src.port_checker import PortChecker
-        return PortChecker
+        PortChecker = load_port_checker()
+        if csv_path == "-":
+            results = check_batch(sys.stdin, PortChecker)
+        else:
+            with open(csv_path, newline="", encoding="utf-8") as source:
+                results = check_batch(source, PortChecker, os.path.dirname(csv_path))
     except ImportError:
-        print(json.dumps({
-            "can_restart": False,
-            "message": "Erreur : Impossible d'importer PortChecker"
-        }))
+        emit(encode, error_result(ERROR_IMPORT, "Erreur : Impossible d'importer PortChecker"))
         sys.exit(1)
+    except (OSError, ValueError) as e:
+        emit(encode, error_result(ERROR_BATCH_INPUT, f"Erreur : {str(e)}"))
+        sys.exit(1)
+
+    if metrics_file:
+        write_metrics(metrics_file, results, started)
+
+    if "--only-blocked" in options:
+        results = [result for result in results if not result["can_restart"]]
+
+    if "--compact" in options:
+        emit(encode, {
+            "schema_version": SCHEMA_VERSION,
+            "fields": COMPACT_FIELDS,
+            "records": [compact_result(result) for result in results],
+        })
+    else:
+        emit(encode, results)
+    sys.exit(0)
 
-# Import global
-PortChecker = import_port_checker()
+
+def parse_args(argv):
+    """
+    Analyse la ligne de commande à la main (argparse coûte ~10 ms d'import)
+
+    Returns:
+        (format, fichier de métriques, arguments restants) ; arguments vaut
+        None si la ligne de commande est invalide
+    """
+    args = list(argv)
+    values = {"--format": "json", "--metrics-file": None}
+    for option in values:
+        if option in args:
+            position = args.index(option)
+            if position + 1 >= len(args):
+                return values["--format"], None, None
+            values[option] = args[position + 1]
+            del args[position:position + 2]
+    output_format, metrics_file = values["--format"], values["--metrics-file"]
+
+    if output_format not in FORMATS:
+        return "json", metrics_file, None
+    if not args:
+        return output_format, metrics_file, None
+    if args[0] == "--batch" and (len(args) < 2 or not BATCH_OPTIONS.issuperset(args[2:])):
+        return output_format, metrics_file, None
+    return output_format, metrics_file, args
 
 
 def main():
     """Point d'entrée du script CLI"""
-    
-    if len(sys.argv) < 2:
-        result = {
-            "can_restart": False,
-            "message": "Usage: check_port_cli.py <fichier_stats>"
-        }
-        print(json.dumps(result))
+
+    started = time.perf_counter()
+    output_format, metrics_file, args = parse_args(sys.argv[1:])
+    try:
+        encode = load_encoder(output_format)
+    except ImportError:
+        emit(load_encoder(), error_result(
+            ERROR_FORMAT, "Erreur : le format msgpack nécessite le paquet msgpack"
+        ))
+        sys.exit(1)
+
+    if args is None:
+        emit(encode, error_result(ERROR_USAGE, USAGE))
         sys.exit(1)
-    
-    file_path = sys.argv[1]
-    
+
+    if args[0] == "--batch":
+        main_batch(args[1], args[2:], encode, metrics_file, started)
+
+    file_path = args[0]
+
+    try:
+        PortChecker = load_port_checker()
+    except ImportError:
+        emit(encode, error_result(ERROR_IMPORT, "Erreur : Impossible d'importer PortChecker"))
+        sys.exit(1)
+
     try:
-        checker = PortChecker(file_path)
+        checker = PortChecker(file_path, validate=True)
         status = checker.check()
-        
-        result = {
-            "can_restart": status.can_restart,
-            "message": status.block_reason or "OK - Toutes les conditions sont remplies",
-            "pon_power": status.pon_power,
-            "ratio": status.ratio,
-            "ack": status.ack,
-            "req": status.req,
-            "slice_status": status.slice_status
-        }
-        
-        print(json.dumps(result, ensure_ascii=False))
+
+        result = port_result(status)
+        if metrics_file:
+            write_metrics(metrics_file, [dict(result, port=file_path)], started)
+        emit(encode, result)
         sys.exit(0 if status.can_restart else 1)
-        
+
     except FileNotFoundError as e:
-        result = {
-            "can_restart": False,
-            "message": f"Erreur : {str(e)}"
-        }
-        print(json.dumps(result))
+        emit(encode, error_result(ERROR_FILE_NOT_FOUND, f"Erreur : {str(e)}"))
         sys.exit(1)
     except Exception as e:
-        result = {
-            "can_restart": False,
-            "message": f"Erreur inattendue : {str(e)}"
-        }
-        print(json.dumps(result))
+        emit(encode, error_result(ERROR_UNEXPECTED, f"Erreur inattendue : {str(e)}"))
         sys.exit(1)
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
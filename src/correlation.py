@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""
+Corrélation des anomalies des sondes réseau avec les décisions de redémarrage
+
+Les mesures nettoyées par context_2/traiter.py (donnees_propres.csv) sont
+indexées par cible et par temps ; chaque décision de PortChecker reçoit les
+anomalies vues par les sondes de son OLT dans une fenêtre configurable, et
+les ports à redémarrer sont classés par impact client.
+
+Usage:
+    python3 src/correlation.py resultats.json --probes donnees_propres.csv \
+        [--window 900] [--at "2025-07-02 10:15:00"] [--map sources.csv]
+"""
+
+from __future__ import annotations
+
+import csv
+import json
+import sys
+from bisect import bisect_left, bisect_right
+from datetime import datetime
+
+# Seuils d'anomalie : copie de ceux de context_2/traiter.py, qui fait foi
+# (traiter.py est un script autonome, sans import commun possible) ;
+# tests/test_correlation.py vérifie que les deux restent identiques
+SEUIL_LATENCE = 200         # ms
+SEUIL_PACKET_LOSS = 5       # %
+SEUIL_BANDWIDTH_MIN = 10    # Mbps
+
+# Format des horodatages des sondes et des décisions
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# Fenêtre par défaut avant la décision (secondes)
+DEFAULT_WINDOW = 900.0
+
+
+def parse_timestamp(value: str) -> float:
+    """Convertit un horodatage 'AAAA-MM-JJ HH:MM:SS' en secondes"""
+    return datetime.strptime(value.strip(), TIMESTAMP_FORMAT).timestamp()
+
+
+def anomaly_reasons(latency_ms: float, packet_loss: float, bandwidth_mbps: float) -> list[str]:
+    """Retourne les règles d'anomalie franchies par une mesure"""
+    reasons = []
+    if latency_ms > SEUIL_LATENCE:
+        reasons.append("latence")
+    if packet_loss > SEUIL_PACKET_LOSS:
+        reasons.append("perte")
+    if bandwidth_mbps < SEUIL_BANDWIDTH_MIN:
+        reasons.append("bande_passante")
+    return reasons
+
+
+class ProbeAnomaly:
+    """Mesure de sonde qui franchit au moins un seuil"""
+
+    __slots__ = ("source", "timestamp", "latency_ms", "packet_loss", "bandwidth_mbps", "reasons")
+
+    def __init__(self, source, timestamp, latency_ms, packet_loss, bandwidth_mbps, reasons):
+        self.source = source
+        self.timestamp = timestamp
+        self.latency_ms = latency_ms
+        self.packet_loss = packet_loss
+        self.bandwidth_mbps = bandwidth_mbps
+        self.reasons = reasons
+
+    def to_dict(self) -> dict:
+        """Convertit l'objet en dictionnaire"""
+        return {
+            "source": self.source,
+            "timestamp": datetime.fromtimestamp(self.timestamp).strftime(TIMESTAMP_FORMAT),
+            "latency_ms": self.latency_ms,
+            "packet_loss": self.packet_loss,
+            "bandwidth_mbps": self.bandwidth_mbps,
+            "reasons": self.reasons,
+        }
+
+
+class AnomalyIndex:
+    """
+    Anomalies des sondes indexées par cible (OLT) et par temps
+
+    Pour chaque cible, les horodatages sont gardés dans une liste triée : une
+    fenêtre se résout par deux recherches dichotomiques (bisect).
+    """
+
+    def __init__(self, anomalies_by_target: dict[str, list[ProbeAnomaly]]):
+        self._times = {}
+        self._anomalies = {}
+        for target, anomalies in anomalies_by_target.items():
+            anomalies = sorted(anomalies, key=lambda anomaly: anomaly.timestamp)
+            self._anomalies[target] = anomalies
+            self._times[target] = [anomaly.timestamp for anomaly in anomalies]
+
+    def __len__(self) -> int:
+        return sum(len(times) for times in self._times.values())
+
+    @classmethod
+    def from_csv(cls, csv_path, target_map: dict[str, str] | None = None) -> "AnomalyIndex":
+        """
+        Construit l'index à partir de donnees_propres.csv
+
+        Args:
+            csv_path: CSV avec les colonnes timestamp, bandwidth_mbps,
+                latency_ms, packet_loss et source
+            target_map: Correspondance source de sonde → OLT (par défaut la
+                source porte le nom de l'OLT)
+        """
+        target_map = target_map or {}
+        anomalies_by_target = {}
+
+        with open(csv_path, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                try:
+                    latency = float(row["latency_ms"])
+                    loss = float(row["packet_loss"])
+                    bandwidth = float(row["bandwidth_mbps"])
+                    timestamp = parse_timestamp(row["timestamp"])
+                except (KeyError, TypeError, ValueError):
+                    continue
+
+                reasons = anomaly_reasons(latency, loss, bandwidth)
+                if not reasons:
+                    continue
+
+                source = row.get("source") or ""
+                target = target_map.get(source, source)
+                anomalies_by_target.setdefault(target, []).append(
+                    ProbeAnomaly(source, timestamp, latency, loss, bandwidth, reasons)
+                )
+
+        return cls(anomalies_by_target)
+
+    def window(self, target: str, at: float, before: float, after: float = 0.0) -> list[ProbeAnomaly]:
+        """Anomalies d'une cible entre at - before et at + after (inclus)"""
+        times = self._times.get(target)
+        if not times:
+            return []
+        start = bisect_left(times, at - before)
+        end = bisect_right(times, at + after)
+        return self._anomalies[target][start:end]
+
+
+def correlate(results: list[dict], index: AnomalyIndex, at: float,
+              window: float = DEFAULT_WINDOW) -> list[dict]:
+    """
+    Associe à chaque décision les anomalies de sonde de son OLT
+
+    Args:
+        results: Résultats du CLI (--batch) avec au moins olt et can_restart ;
+            un champ checked_at ('AAAA-MM-JJ HH:MM:SS') remplace at
+        index: Anomalies indexées par OLT
+        at: Instant de la décision par défaut (secondes)
+        window: Durée examinée avant la décision (secondes)
+
+    Returns:
+        Les résultats enrichis de probe_anomalies et impact, les ports
+        redémarrables en tête, par impact décroissant
+    """
+    correlated = []
+    for result in results:
+        checked_at = parse_timestamp(result["checked_at"]) if result.get("checked_at") else at
+        anomalies = index.window(result.get("olt", ""), checked_at, window)
+        clients = 1 if result.get("nb_clients") is None else result["nb_clients"]
+
+        enriched = dict(result)
+        enriched["probe_anomalies"] = [anomaly.to_dict() for anomaly in anomalies]
+        enriched["impact"] = clients * len(anomalies)
+        correlated.append(enriched)
+
+    correlated.sort(key=lambda result: (not result.get("can_restart"), -result["impact"]))
+    return correlated
+
+
+def load_target_map(csv_path) -> dict[str, str]:
+    """Lit la correspondance source → OLT (CSV avec les colonnes source, olt)"""
+    with open(csv_path, newline="", encoding="utf-8") as f:
+        return {row["source"]: row["olt"] for row in csv.DictReader(f)}
+
+
+def main():
+    """Point d'entrée : résultats JSON du CLI + mesures des sondes → JSON classé"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("results",
+                        help="sortie JSON de check_port_cli.py --batch [--compact] (ou rapport de parc)")
+    parser.add_argument("--probes", required=True, help="donnees_propres.csv de traiter.py")
+    parser.add_argument("--window", type=float, default=DEFAULT_WINDOW,
+                        help="secondes examinées avant la décision (défaut : 900)")
+    parser.add_argument("--at", help="instant de la décision 'AAAA-MM-JJ HH:MM:SS' (défaut : maintenant)")
+    parser.add_argument("--map", help="CSV source,olt de correspondance des sondes")
+    args = parser.parse_args()
+
+    try:
+        with open(args.results, encoding="utf-8") as f:
+            results = json.load(f)
+        if isinstance(results, dict):
+            if "fields" in results and "records" in results:
+                # Sortie --compact : un tableau par port, champs nommés dans fields
+                results = [dict(zip(results["fields"], record)) for record in results["records"]]
+            else:
+                results = results["results"]
+        target_map = load_target_map(args.map) if args.map else None
+        index = AnomalyIndex.from_csv(args.probes, target_map)
+        at = parse_timestamp(args.at) if args.at else datetime.now().timestamp()
+    except (OSError, ValueError, KeyError) as e:
+        print(json.dumps({"message": f"Erreur : {str(e)}"}, ensure_ascii=False))
+        sys.exit(1)
+
+    print(json.dumps(correlate(results, index, at, args.window), ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
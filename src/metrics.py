@@ -0,0 +1,417 @@
+#!/usr/bin/env python3
+"""
+Exposition des métriques au format OpenMetrics (Prometheus)
+
+Un registre en mémoire, borné et protégé par un verrou, reçoit l'état de
+chaque port (ratio, PON-Power, slice, can_restart) et les mesures propres
+aux outils (durées, nombre de ports vérifiés). Il est publié :
+- soit dans un fichier pour le textfile collector de node_exporter
+  (check_port_cli.py --metrics-file, ou --textfile ici) ;
+- soit par un petit serveur HTTP local (--listen) qui relit périodiquement
+  les résultats du CLI et les fichiers .prom écrits par context_2/traiter.py.
+
+Usage:
+    python3 src/metrics.py --results fleet_report.json [--results ...] \
+        [--include context_2/metriques_sondes.prom] \
+        (--listen 127.0.0.1:9469 [--interval 30] | --textfile olt.prom)
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+# Nombre maximal de séries conservées : au-delà, la série mise à jour le
+# moins récemment est évincée (un parc qui grandit ne fait pas grossir la
+# mémoire sans limite)
+DEFAULT_MAX_SERIES = 200_000
+
+CONTENT_TYPE = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+
+DEFAULT_LISTEN = "127.0.0.1:9469"
+DEFAULT_INTERVAL = 30.0
+
+# Types de métriques acceptés (un résumé ne publie que _sum et _count)
+METRIC_TYPES = ("gauge", "counter", "summary")
+
+# Métriques par port, alimentées par record_port_results
+PORT_METRICS = (
+    ("olt_port_ratio_percent", "Ratio ACK/REQ du port (%)"),
+    ("olt_port_pon_power_good", "PON-Power GOOD (1) ou non (0)"),
+    ("olt_port_slice_online", "Slice ONLINE (1) ou non (0)"),
+    ("olt_port_can_restart", "Redémarrage autorisé (1) ou bloqué (0)"),
+    ("olt_port_reason_code", "reason_code du dernier contrôle (schéma du CLI)"),
+    ("olt_port_clients", "Nombre de clients du port"),
+)
+
+# Mesure publiée → champs du fichier de stats dont elle dépend (clés de
+# parse.provenance dans les résultats du CLI)
+PORT_METRIC_FIELDS = {
+    "olt_port_ratio_percent": ("ack", "req"),
+    "olt_port_pon_power_good": ("pon_power",),
+    "olt_port_slice_online": ("slice_status",),
+    "olt_port_clients": ("nb_clients",),
+}
+
+# reason_code d'un fichier non reconnu, incomplet ou contradictoire (4, 5, 6
+# dans le schéma du CLI) : ses valeurs par défaut ne sont pas des mesures
+UNTRUSTED_REASON_CODES = (4, 5, 6)
+
+
+def escape_label(value) -> str:
+    """Échappe une valeur de label (antislash, guillemet, saut de ligne)"""
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def format_value(value: float) -> str:
+    """Représentation OpenMetrics d'une valeur (entiers sans décimales)"""
+    if value != value:
+        return "NaN"
+    if float(value).is_integer() and abs(value) < 1e15:
+        return str(int(value))
+    return repr(float(value))
+
+
+class MetricsRegistry:
+    """
+    Registre de métriques borné, sûr en accès concurrent
+
+    Chaque série (nom de l'échantillon + labels) est gardée dans un
+    OrderedDict dans l'ordre de dernière mise à jour : quand max_series est
+    atteint, la plus ancienne est évincée. Toutes les opérations prennent le
+    verrou ; render() copie les séries sous le verrou puis formate hors du
+    verrou, une lecture ne voit jamais une mise à jour à moitié faite.
+    """
+
+    def __init__(self, max_series: int = DEFAULT_MAX_SERIES):
+        self.max_series = max_series
+        self.evicted = 0
+        self._lock = threading.Lock()
+        self._families = {}
+        self._series = OrderedDict()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._series)
+
+    def describe(self, name: str, metric_type: str, help_text: str):
+        """
+        Déclare une famille de métriques
+
+        Raises:
+            ValueError: Si le type est inconnu ou contredit une déclaration
+        """
+        if metric_type not in METRIC_TYPES:
+            raise ValueError(f"Type de métrique inconnu : {metric_type}")
+        with self._lock:
+            known = self._families.get(name)
+            if known is not None and known[0] != metric_type:
+                raise ValueError(f"{name} est déjà déclarée comme {known[0]}")
+            self._families[name] = (metric_type, help_text)
+
+    def _update(self, name: str, suffix: str, labels: dict, value: float, add: bool):
+        """Écrit une série sous le verrou (l'appelant tient le verrou)"""
+        if name not in self._families:
+            raise ValueError(f"Métrique non déclarée : {name}")
+        key = (name, suffix, tuple(sorted(labels.items())))
+        if add:
+            value += self._series.get(key, 0.0)
+        self._series[key] = value
+        self._series.move_to_end(key)
+        while len(self._series) > self.max_series:
+            self._series.popitem(last=False)
+            self.evicted += 1
+
+    def set(self, name: str, value: float, **labels):
+        """Fixe la valeur d'une jauge"""
+        with self._lock:
+            self._update(name, "", labels, float(value), add=False)
+
+    def inc(self, name: str, amount: float = 1.0, **labels):
+        """Incrémente un compteur"""
+        with self._lock:
+            self._update(name, "_total", labels, float(amount), add=True)
+
+    def observe(self, name: str, value: float, **labels):
+        """Ajoute une observation à un résumé (somme et nombre)"""
+        with self._lock:
+            self._update(name, "_sum", labels, float(value), add=True)
+            self._update(name, "_count", labels, 1.0, add=True)
+
+    def replace_families(self, names, *sources: MetricsRegistry):
+        """
+        Remplace toutes les séries des familles names par celles des sources
+
+        En une seule prise du verrou : une lecture voit l'ancien ou le nouvel
+        état, jamais des familles vides. Les séries absentes des sources
+        disparaissent (port retiré, fichier devenu illisible).
+        """
+        names = set(names)
+        families, series = {}, []
+        for source in sources:
+            with source._lock:
+                families.update((name, source._families[name])
+                                for name in names if name in source._families)
+                series.extend((key, value) for key, value in source._series.items()
+                              if key[0] in names)
+        with self._lock:
+            self._families.update(families)
+            for key in [key for key in self._series if key[0] in names]:
+                del self._series[key]
+            self._series.update(series)
+            while len(self._series) > self.max_series:
+                self._series.popitem(last=False)
+                self.evicted += 1
+
+    @contextmanager
+    def timer(self, name: str, **labels):
+        """Mesure la durée d'un bloc dans le résumé name (secondes)"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def render(self, include: str = "") -> str:
+        """
+        Produit l'exposition OpenMetrics (terminée par # EOF)
+
+        Args:
+            include: Texte d'exposition déjà formaté à ajouter avant # EOF
+                (fichiers .prom d'autres outils)
+        """
+        with self._lock:
+            families = dict(self._families)
+            series = list(self._series.items())
+
+        by_family = {}
+        for (name, suffix, labels), value in series:
+            by_family.setdefault(name, []).append((suffix, labels, value))
+
+        lines = []
+        for name in sorted(by_family):
+            metric_type, help_text = families[name]
+            lines.append(f"# TYPE {name} {metric_type}")
+            lines.append(f"# HELP {name} {help_text}")
+            for suffix, labels, value in sorted(by_family[name]):
+                label_text = ",".join(f'{key}="{escape_label(val)}"' for key, val in labels)
+                label_text = f"{{{label_text}}}" if label_text else ""
+                lines.append(f"{name}{suffix}{label_text} {format_value(value)}")
+
+        text = "\n".join(lines) + "\n" if lines else ""
+        if include:
+            text += include if include.endswith("\n") else include + "\n"
+        return text + "# EOF\n"
+
+
+def write_textfile(registry: MetricsRegistry, path, include: str = ""):
+    """
+    Écrit l'exposition dans un fichier pour le textfile collector
+
+    Écriture dans un fichier temporaire puis os.replace : node_exporter ne
+    lit jamais un fichier à moitié écrit.
+    """
+    path = os.fspath(path)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(registry.render(include))
+    os.replace(tmp_path, path)
+
+
+def record_port_results(registry: MetricsRegistry, results: list[dict], olt: str = ""):
+    """
+    Publie l'état de chaque port à partir des résultats du CLI
+
+    Args:
+        results: Résultats de check_port_cli.py (mode fichier ou --batch) ;
+            les champs olt et port deviennent des labels
+        olt: OLT par défaut des résultats qui n'en portent pas
+    """
+    for name, help_text in PORT_METRICS:
+        registry.describe(name, "gauge", help_text)
+
+    for result in results:
+        labels = {"olt": result.get("olt", olt), "port": result.get("port", "")}
+        registry.set("olt_port_can_restart", int(bool(result.get("can_restart"))), **labels)
+        if "reason_code" in result:
+            registry.set("olt_port_reason_code", result["reason_code"], **labels)
+        if result.get("pon_power") is None or result.get("reason_code") in UNTRUSTED_REASON_CODES:
+            # Fichier introuvable, non reconnu, incomplet ou contradictoire :
+            # un ratio à 0 ou un slice hors ligne y serait un faux signal
+            continue
+        provenance = (result.get("parse") or {}).get("provenance")
+        values = {
+            "olt_port_ratio_percent": result.get("ratio", 0.0),
+            "olt_port_pon_power_good": int(result["pon_power"] == "GOOD"),
+            "olt_port_slice_online": int(result.get("slice_status") == "ONLINE"),
+            "olt_port_clients": result.get("nb_clients"),
+        }
+        for name, value in values.items():
+            # Sans provenance (résultats --compact), on se fie au reason_code
+            read = provenance is None or all(f in provenance for f in PORT_METRIC_FIELDS[name])
+            if read and value is not None:
+                registry.set(name, value, **labels)
+
+
+def record_run(registry: MetricsRegistry, tool: str, duration: float, results: list[dict]):
+    """Publie les mesures d'une exécution d'un outil (durée, ports, blocages)"""
+    registry.describe("olt_tool_last_run_seconds", "gauge", "Durée de la dernière exécution (s)")
+    registry.describe("olt_tool_last_run_timestamp_seconds", "gauge", "Fin de la dernière exécution")
+    registry.describe("olt_tool_last_run_ports", "gauge", "Ports traités par la dernière exécution")
+    registry.describe("olt_tool_last_run_blocked", "gauge", "Ports bloqués à la dernière exécution")
+    registry.set("olt_tool_last_run_seconds", duration, tool=tool)
+    registry.set("olt_tool_last_run_timestamp_seconds", time.time(), tool=tool)
+    registry.set("olt_tool_last_run_ports", len(results), tool=tool)
+    registry.set("olt_tool_last_run_blocked",
+                 sum(1 for result in results if not result.get("can_restart")), tool=tool)
+
+
+def load_results(path) -> list[dict]:
+    """Lit des résultats du CLI : liste, rapport de parc ({"results": ...}) ou résultat seul"""
+    import json
+
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    if isinstance(data, dict):
+        if "records" in data and "fields" in data:
+            return [dict(zip(data["fields"], record)) for record in data["records"]]
+        return data.get("results", [data])
+    return data
+
+
+def read_includes(paths) -> str:
+    """Concatène les fichiers .prom à inclure (les fichiers absents sont ignorés)"""
+    parts = []
+    for path in paths:
+        try:
+            with open(path, encoding="utf-8") as f:
+                parts.append(f.read().replace("# EOF\n", ""))
+        except FileNotFoundError:
+            continue
+    return "".join(part if part.endswith("\n") else part + "\n" for part in parts if part)
+
+
+class Exporter:
+    """
+    Relit périodiquement les sources et publie le registre en HTTP
+
+    Les séries par port sont reconstruites à chaque relecture : un port qui
+    n'apparaît plus dans les résultats cesse d'être publié. Un fichier de
+    résultats illisible garde ses derniers résultats lus ; un fichier
+    supprimé retire ses ports.
+    """
+
+    def __init__(self, results_paths, include_paths=(), max_series: int = DEFAULT_MAX_SERIES):
+        self.results_paths = list(results_paths)
+        self.include_paths = list(include_paths)
+        self.registry = MetricsRegistry(max_series)
+        self.registry.describe("olt_exporter_refresh_seconds", "summary", "Durée des relectures")
+        self.registry.describe("olt_exporter_refresh_errors", "counter", "Relectures en erreur")
+        self.registry.describe("olt_exporter_scrapes", "counter", "Requêtes /metrics servies")
+        self.include_text = ""
+        # Séries par port de chaque fichier de résultats, à sa dernière lecture réussie
+        self._ports = {}
+
+    def refresh(self):
+        """Relit les résultats du CLI et les fichiers .prom inclus"""
+        with self.registry.timer("olt_exporter_refresh_seconds"):
+            for path in self.results_paths:
+                try:
+                    ports = MetricsRegistry(self.registry.max_series)
+                    record_port_results(ports, load_results(path))
+                    self._ports[path] = ports
+                except FileNotFoundError:
+                    self._ports.pop(path, None)
+                    self.registry.inc("olt_exporter_refresh_errors", source=os.fspath(path))
+                except (OSError, ValueError, TypeError, AttributeError):
+                    self.registry.inc("olt_exporter_refresh_errors", source=os.fspath(path))
+            self.registry.replace_families(
+                [name for name, _ in PORT_METRICS], *self._ports.values()
+            )
+            self.include_text = read_includes(self.include_paths)
+
+    def render(self) -> str:
+        self.registry.inc("olt_exporter_scrapes")
+        return self.registry.render(self.include_text)
+
+    def serve(self, host: str, port: int):
+        """Démarre le serveur HTTP (thread par requête) et retourne le serveur"""
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        exporter = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?", 1)[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = exporter.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", CONTENT_TYPE)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
+
+
+def parse_listen(value: str) -> tuple[str, int]:
+    """Analyse hôte:port (ex. 127.0.0.1:9469)"""
+    host, _, port = value.rpartition(":")
+    return host or "127.0.0.1", int(port)
+
+
+def main():
+    """Point d'entrée : exporteur HTTP ou écriture d'un fichier .prom"""
+    import argparse
+    import sys
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--results", action="append", default=[],
+                        help="sortie JSON du CLI ou rapport de parc (répétable)")
+    parser.add_argument("--include", action="append", default=[],
+                        help="fichier .prom à publier tel quel, ex. metriques_sondes.prom (répétable)")
+    output = parser.add_mutually_exclusive_group(required=True)
+    output.add_argument("--listen", help=f"adresse du serveur HTTP (ex. {DEFAULT_LISTEN})")
+    output.add_argument("--textfile", help="fichier .prom à écrire pour node_exporter")
+    parser.add_argument("--interval", type=float, default=DEFAULT_INTERVAL,
+                        help="secondes entre deux relectures (défaut : 30)")
+    parser.add_argument("--max-series", type=int, default=DEFAULT_MAX_SERIES)
+    args = parser.parse_args()
+
+    exporter = Exporter(args.results, args.include, args.max_series)
+    exporter.refresh()
+
+    if args.textfile:
+        try:
+            write_textfile(exporter.registry, args.textfile, exporter.include_text)
+        except OSError as e:
+            print(f"Erreur : {e}", file=sys.stderr)
+            sys.exit(1)
+        return
+
+    try:
+        server = exporter.serve(*parse_listen(args.listen))
+    except (OSError, ValueError) as e:
+        print(f"Erreur : {e}", file=sys.stderr)
+        sys.exit(1)
+    print(f"Métriques sur http://{args.listen}/metrics", file=sys.stderr)
+    try:
+        while True:
+            time.sleep(args.interval)
+            exporter.refresh()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -3,20 +3,178 @@ Vérificateur de port OLT
 Analyze les statistiques et détermine si un redémarrage est possible
 """
 
+from __future__ import annotations
+
+import io
+import os
 import re
-from pathlib import Path
-from dataclasses import dataclass
-from typing import Optional, Iterator
+from collections.abc import Iterable, Iterator
+
+# Imports volontairement légers : le CLI est lancé une fois par port par
+# Ansible, le temps de démarrage domine. dataclasses, typing et pathlib
+# (~20 ms d'import cumulés) ne sont pas chargés ; Path l'est à la demande.
+
+
+# Codes de raison stables, publiés à côté du message en français (schéma de
+# sortie du CLI) : les consommateurs n'ont pas à analyser le texte
+REASON_OK = 0
+REASON_PON_POWER = 1
+REASON_RATIO = 2
+REASON_SLICE = 3
+REASON_NOT_STATS = 4
+REASON_MISSING_DATA = 5
+REASON_CONFLICTING_DATA = 6
+
+# Validation (parse_lines_validated) : une entrée sans aucun marqueur de stats
+# dans ce préfixe est rejetée sans lire la suite ; les lignes plus longues
+# que MAX_LINE_CHARS sont découpées pour que la lecture reste bornée
+PREFIX_LINES = 64
+PREFIX_BYTES = 8192
+MAX_LINE_CHARS = 4096
+
+# Les compteurs des OLT tiennent sur 64 bits : une valeur plus grande est
+# illisible (et ne passerait ni par orjson ni par msgpack)
+MAX_COUNTER = 2**64 - 1
+
+# Champs sans lesquels aucune décision n'est possible
+REQUIRED_FIELDS = ("pon_power", "req", "ack", "slice_status")
+
+# Types d'anomalies relevées par la validation
+ISSUE_NOT_STATS = "not_stats"
+ISSUE_MISSING = "missing"
+ISSUE_CONFLICT = "conflict"
+ISSUE_DUPLICATE = "duplicate"
+ISSUE_MALFORMED = "malformed"
+
+PON_POWER_RE = re.compile(r'PON-Power\s+(\w+)')
+REQ_RE = re.compile(r'(\d+)\s+REQ')
+ACK_RE = re.compile(r'(\d+)\s+ACK')
+SLICE_RE = re.compile(r'Slice:\s+(\w+)')
+NB_CLIENTS_RE = re.compile(r'Nb clients:\s+(\d+)')
+
+# Signatures des formats compressés reconnus (octets de tête du fichier)
+COMPRESSION_MAGIC = (
+    (b"\x1f\x8b", "gzip"),
+    (b"\xfd7zXZ\x00", "xz"),
+    (b"\x28\xb5\x2f\xfd", "zstd"),
+    (b"BZh", "bz2"),
+)
+
+
+class ParseIssue:
+    """Anomalie relevée par la validation d'un fichier de stats"""
+
+    __slots__ = ("kind", "field", "lines")
+
+    def __init__(self, kind: str, field: str | None = None, lines: list[int] | None = None):
+        self.kind = kind
+        self.field = field
+        self.lines = lines or []
+
+    def __repr__(self) -> str:
+        return f"ParseIssue(kind={self.kind!r}, field={self.field!r}, lines={self.lines!r})"
+
+    def to_dict(self) -> dict:
+        """Convertit l'objet en dictionnaire"""
+        return {"kind": self.kind, "field": self.field, "lines": self.lines}
+
+
+class ParseReport:
+    """
+    Résultat de la validation : provenance des champs et anomalies
+
+    provenance associe chaque champ lu à (numéro de ligne, offset en octets
+    du début de la ligne). Les doublons de même valeur et les lignes mal
+    formées sont signalés sans bloquer ; une entrée rejetée, un champ
+    obligatoire absent ou des valeurs contradictoires bloquent la décision.
+    """
+
+    __slots__ = ("provenance", "issues")
+
+    def __init__(self):
+        self.provenance = {}
+        self.issues = []
+
+    def issue(self, kind: str) -> ParseIssue | None:
+        """Première anomalie d'un type donné"""
+        for issue in self.issues:
+            if issue.kind == kind:
+                return issue
+        return None
+
+    @property
+    def reason_code(self) -> int:
+        """REASON_NOT_STATS, REASON_CONFLICTING_DATA, REASON_MISSING_DATA ou REASON_OK"""
+        if self.issue(ISSUE_NOT_STATS):
+            return REASON_NOT_STATS
+        if self.issue(ISSUE_CONFLICT):
+            return REASON_CONFLICTING_DATA
+        if self.issue(ISSUE_MISSING):
+            return REASON_MISSING_DATA
+        return REASON_OK
+
+    @property
+    def block_reason(self) -> str | None:
+        """Raison du blocage due aux données elles-mêmes, si applicable"""
+        if self.issue(ISSUE_NOT_STATS):
+            return "Redémarrage bloqué : cause = fichier non reconnu (pas de statistiques en tête)"
+        conflicts = [issue for issue in self.issues if issue.kind == ISSUE_CONFLICT]
+        if conflicts:
+            details = ", ".join(
+                f"{issue.field} lignes {', '.join(map(str, issue.lines))}" for issue in conflicts
+            )
+            return f"Redémarrage bloqué : cause = données contradictoires ({details})"
+        missing = [issue.field for issue in self.issues if issue.kind == ISSUE_MISSING]
+        if missing:
+            return f"Redémarrage bloqué : cause = données manquantes ({', '.join(missing)})"
+        return None
+
+    def to_dict(self) -> dict:
+        """Convertit l'objet en dictionnaire"""
+        return {
+            "provenance": {
+                field: {"line": line, "offset": offset}
+                for field, (line, offset) in self.provenance.items()
+            },
+            "issues": [issue.to_dict() for issue in self.issues],
+        }
 
 
-@dataclass
 class PortStatus:
     """Représente l'état d'un port OLT"""
 
-    pon_power: Optional[str] = None
-    ack: int = 0
-    req: int = 0
-    slice_status: Optional[str] = None
+    __slots__ = ("pon_power", "ack", "req", "slice_status", "nb_clients", "report")
+
+    def __init__(
+        self,
+        pon_power: str | None = None,
+        ack: int = 0,
+        req: int = 0,
+        slice_status: str | None = None,
+        nb_clients: int | None = None,
+        report: ParseReport | None = None,
+    ):
+        self.pon_power = pon_power
+        self.ack = ack
+        self.req = req
+        self.slice_status = slice_status
+        self.nb_clients = nb_clients
+        self.report = report
+
+    def __repr__(self) -> str:
+        return (
+            f"PortStatus(pon_power={self.pon_power!r}, ack={self.ack!r}, "
+            f"req={self.req!r}, slice_status={self.slice_status!r}, "
+            f"nb_clients={self.nb_clients!r})"
+        )
+
+    def __eq__(self, other) -> bool:
+        if other.__class__ is not self.__class__:
+            return NotImplemented
+        return (
+            (self.pon_power, self.ack, self.req, self.slice_status, self.nb_clients) ==
+            (other.pon_power, other.ack, other.req, other.slice_status, other.nb_clients)
+        )
 
     @property
     def ratio(self) -> float:
@@ -28,6 +186,8 @@ class PortStatus:
     @property
     def can_restart(self) -> bool:
         """Détermine si le redémarrage est autorisé"""
+        if self.report is not None and self.report.reason_code != REASON_OK:
+            return False
         return (
             self.pon_power == "GOOD" and
             self.ratio >= 95.0 and
@@ -35,8 +195,11 @@ class PortStatus:
         )
     
     @property
-    def block_reason(self) -> Optional[str]:
+    def block_reason(self) -> str | None:
         """Retourne la raison du blocage si applicable"""
+        if self.report is not None and self.report.reason_code != REASON_OK:
+            return self.report.block_reason
+
         if self.pon_power != "GOOD":
             return "Redémarrage bloqué : cause = PON Power FAIL"
         
@@ -46,46 +209,321 @@ class PortStatus:
             return f"Redémarrage bloqué : cause = slice {self.slice_status}"
         
         return None
+
+    @property
+    def reason_code(self) -> int:
+        """Code numérique de la raison du blocage (REASON_OK si autorisé)"""
+        if self.report is not None and self.report.reason_code != REASON_OK:
+            return self.report.reason_code
+        if self.pon_power != "GOOD":
+            return REASON_PON_POWER
+        if self.ratio < 95.0:
+            return REASON_RATIO
+        if self.slice_status != "ONLINE":
+            return REASON_SLICE
+        return REASON_OK
     
     def to_dict(self) -> dict:
         """Convertit l'object en dictionnaire"""
-        return {
+        result = {
             "pon_power": self.pon_power,
             "ack": self.ack,
             "req": self.req,
             "ratio": self.ratio,
             "slice_status": self.slice_status,
+            "nb_clients": self.nb_clients,
             "can_restart": self.can_restart,
-            "block_reason": self.block_reason
+            "block_reason": self.block_reason,
+            "reason_code": self.reason_code
         }
+        if self.report is not None:
+            result["parse"] = self.report.to_dict()
+        return result
+
+
+def detect_compression(file_path: str | os.PathLike) -> str | None:
+    """
+    Détecte le format de compression d'après les premiers octets du fichier
+
+    Returns:
+        "gzip", "xz", "zstd", "bz2" ou None pour un fichier texte
+    """
+    with open(file_path, 'rb') as f:
+        head = f.read(6)
+    for magic, name in COMPRESSION_MAGIC:
+        if head.startswith(magic):
+            return name
+    return None
+
+
+def open_stream(file_path: str | os.PathLike, compression: str | None = None) -> io.BufferedIOBase:
+    """
+    Ouvre un fichier en lecture binaire en décompressant à la volée
+
+    Les modules de décompression ne sont importés que si nécessaire.
+
+    Raises:
+        RuntimeError: Si le format zstd est demandé sans le paquet zstandard
+    """
+    if compression is None:
+        compression = detect_compression(file_path)
+
+    if compression == "gzip":
+        import gzip
+        return gzip.open(file_path, 'rb')
+    if compression == "xz":
+        import lzma
+        return lzma.open(file_path, 'rb')
+    if compression == "bz2":
+        import bz2
+        return bz2.open(file_path, 'rb')
+    if compression == "zstd":
+        try:
+            import zstandard
+        except ImportError:
+            raise RuntimeError(
+                "Le paquet zstandard est requis pour lire les fichiers .zst"
+            ) from None
+        raw = open(file_path, 'rb')
+        return zstandard.ZstdDecompressor().stream_reader(raw, closefd=True)
+    return open(file_path, 'rb')
+
+
+def parse_lines(lines: Iterable[str]) -> PortStatus:
+    """
+    Analyse des lignes de statistiques et retourne l'état du port
+
+    Args:
+        lines: Itérable de lignes texte (fichier, membre d'archive...)
+    """
+    status = PortStatus()
+
+    for line in lines:
+        #on cherche PON-Power
+        if 'PON-Power' in line:
+            match = PON_POWER_RE.search(line)
+            if match:
+                status.pon_power = match.group(1)
+
+        #on cherche REQ & ACK
+        elif 'REQ' in line and 'ACK' in line:
+            req_match = REQ_RE.search(line)
+            ack_match = ACK_RE.search(line)
+            if req_match and ack_match:
+                status.req = int(req_match.group(1))
+                status.ack = int(ack_match.group(1))
+
+        #on cherche Slice status
+        elif 'Slice:' in line:
+            match = SLICE_RE.search(line)
+            if match:
+                status.slice_status = match.group(1)
+
+        #on cherche le nombre de clients
+        elif 'Nb clients:' in line:
+            match = NB_CLIENTS_RE.search(line)
+            if match:
+                status.nb_clients = int(match.group(1))
+    return status
+
+
+def _counter(match) -> int | None:
+    """Valeur d'un compteur (None s'il est absent ou dépasse 64 bits)"""
+    if match is None:
+        return None
+    value = int(match.group(1))
+    return value if value <= MAX_COUNTER else None
+
+
+def _field_values(line: str) -> list[tuple[str, object]]:
+    """
+    Extrait les champs d'une ligne de stats
+
+    Returns:
+        [(champ, valeur)...], vide si la ligne ne porte aucun champ ; la
+        valeur est None si le marqueur est présent mais illisible (ou si
+        un compteur dépasse MAX_COUNTER)
+    """
+    if 'PON-Power' in line:
+        match = PON_POWER_RE.search(line)
+        return [("pon_power", match.group(1) if match else None)]
+    if 'REQ' in line and 'ACK' in line:
+        return [
+            ("req", _counter(REQ_RE.search(line))),
+            ("ack", _counter(ACK_RE.search(line))),
+        ]
+    if 'Slice:' in line:
+        match = SLICE_RE.search(line)
+        return [("slice_status", match.group(1) if match else None)]
+    if 'Nb clients:' in line:
+        return [("nb_clients", _counter(NB_CLIENTS_RE.search(line)))]
+    return []
+
+
+def parse_lines_validated(lines: Iterable[str]) -> PortStatus:
+    """
+    Analyse des lignes de statistiques en vérifiant les données
+
+    Contrairement à parse_lines, un champ absent n'est pas remplacé
+    silencieusement par sa valeur par défaut : le PortStatus retourné porte
+    un ParseReport (provenance et anomalies) et, si les données ne
+    permettent pas de décider, une raison de blocage distincte au lieu d'un
+    faux ratio bas. Sans marqueur de stats dans les PREFIX_LINES premières
+    lignes (ou PREFIX_BYTES premiers octets), l'entrée est rejetée sans
+    lire la suite.
+
+    Args:
+        lines: Itérable de lignes texte (fichier, membre d'archive...)
+    """
+    status = PortStatus()
+    report = status.report = ParseReport()
+    seen = {}
+    repeated = {}
+    recognized = False
+    offset = 0
+    line_number = 0
+    complete = True
+
+    for line in lines:
+        # Une ligne de plus de MAX_LINE_CHARS arrive en plusieurs morceaux :
+        # seul le premier morceau ouvre une nouvelle ligne
+        if complete:
+            line_number += 1
+        complete = line.endswith('\n')
+
+        if not recognized and (
+            line_number > PREFIX_LINES or offset > PREFIX_BYTES or '\x00' in line
+        ):
+            report.issues.append(ParseIssue(ISSUE_NOT_STATS, lines=[line_number]))
+            return status
+
+        line_offset = offset
+        offset += len(line) if line.isascii() else len(line.encode('utf-8'))
+
+        if 'Stats:' in line:
+            recognized = True
+            continue
+
+        for field, value in _field_values(line):
+            recognized = True
+            if value is None:
+                report.issues.append(ParseIssue(ISSUE_MALFORMED, field, [line_number]))
+            elif field not in seen:
+                seen[field] = [line_number]
+                report.provenance[field] = (line_number, line_offset)
+                setattr(status, field, value)
+            else:
+                # Même valeur : doublon signalé ; valeur différente : conflit,
+                # la première valeur lue est conservée
+                seen[field].append(line_number)
+                kind = ISSUE_DUPLICATE if getattr(status, field) == value else ISSUE_CONFLICT
+                issue = repeated.get(field)
+                if issue is None:
+                    issue = repeated[field] = ParseIssue(kind, field, seen[field])
+                    report.issues.append(issue)
+                elif kind == ISSUE_CONFLICT:
+                    issue.kind = ISSUE_CONFLICT
+
+    if not recognized:
+        report.issues.append(ParseIssue(ISSUE_NOT_STATS))
+        return status
+
+    for field in REQUIRED_FIELDS:
+        if field not in seen:
+            report.issues.append(ParseIssue(ISSUE_MISSING, field))
+    return status
+
+
+def iter_archive(
+    archive_path: str | os.PathLike, validate: bool = False
+) -> Iterator[tuple[str, PortStatus]]:
+    """
+    Parcourt une archive tar de fichiers de stats sans l'extraire
+
+    L'archive est lue en flux (mode "r|"), éventuellement compressée
+    (.tar.gz, .tar.xz, .tar.zst...). Seuls les fichiers réguliers sont analysés.
+    Avec validate, chaque membre passe par parse_lines_validated.
+
+    Yields:
+        Des tuples (nom du membre, PortStatus)
+    """
+    import tarfile
+
+    with open_stream(archive_path) as stream:
+        with tarfile.open(fileobj=stream, mode='r|') as tar:
+            for member in tar:
+                if not member.isfile():
+                    continue
+                member_file = tar.extractfile(member)
+                if validate:
+                    chunks = iter(lambda: member_file.readline(MAX_LINE_CHARS), b'')
+                    lines = (line.decode('utf-8', 'replace') for line in chunks)
+                    yield member.name, parse_lines_validated(lines)
+                else:
+                    lines = (line.decode('utf-8') for line in member_file)
+                    yield member.name, parse_lines(lines)
+
+
 class PortChecker:
     """Vérifie l'état d'un port OLT à partir d'un fichier de stats"""
 
-    def __init__(self, file_path: str | Path):
+    def __init__(self, file_path: str | os.PathLike, validate: bool = False):
         """
         Initialise le checker avec un fichier de stats
 
         Args:
             File_path: Chemin vers le fichier de statistiques
+            validate: Vérifie les données (voir parse_lines_validated) au
+                lieu de garder les valeurs par défaut des champs absents
+
+        Le fichier peut être compressé (gzip, xz, zstd, bz2) : le format est
+        détecté d'après ses premiers octets.
 
         Raises:
             FileNotfoundError: Si le fichier n'existe pas
         """
-        self.file_path = Path(file_path)
+        self._path = os.fspath(file_path)
 
-        if not self.file_path.exists():
+        if not os.path.exists(self._path):
             raise FileNotFoundError(f"Le fichier {file_path} n'existe pas")
+
+        self.compression = detect_compression(self._path)
+        self.validate = validate
+
+    @property
+    def file_path(self):
+        """Chemin du fichier de stats (pathlib.Path, importé à la demande)"""
+        from pathlib import Path
+        return Path(self._path)
         
     def _read_file(self) -> Iterator[str]:
         """
         Lit le fichier ligne par ligne avec un context manager
 
+        Les fichiers compressés sont décompressés en flux, sans fichier
+        intermédiaire sur disque. En mode validate, les octets invalides
+        sont remplacés et les lignes découpées à MAX_LINE_CHARS caractères :
+        un fichier binaire est rejeté sans être lu en entier.
+
         Yields:
             les lignes du fichiers une par une
         """
-        with open(self.file_path, 'r', encoding='utf-8') as f:
-            for line in f:
-                yield line
+        errors = 'replace' if self.validate else 'strict'
+
+        if self.compression is None:
+            with open(self._path, 'r', encoding='utf-8', errors=errors) as f:
+                yield from self._lines(f)
+            return
+
+        with open_stream(self._path, self.compression) as stream:
+            with io.TextIOWrapper(stream, encoding='utf-8', errors=errors) as f:
+                yield from self._lines(f)
+
+    def _lines(self, f) -> Iterator[str]:
+        """Itère sur les lignes d'un fichier texte (bornées en mode validate)"""
+        if self.validate:
+            return iter(lambda: f.readline(MAX_LINE_CHARS), '')
+        return iter(f)
 
     def check(self) -> PortStatus:
         """
@@ -94,27 +532,6 @@ class PortChecker:
         returns:
             Un objet PortStatus avec les données extraites
         """
-        status = PortStatus()
-        
-        #Lire le fichier ligne par ligne
-        for line in self._read_file():
-            #on cherche PON-Power
-            if 'PON-Power' in line:
-                match = re.search(r'PON-Power\s+(\w+)', line)
-                if match:
-                    status.pon_power = match.group(1)
-
-            #on cherche REQ & ACK
-            elif 'REQ' in line and 'ACK' in line:
-                req_match = re.search(r'(\d+)\s+REQ', line)
-                ack_match = re.search(r'(\d+)\s+ACK', line)
-                if req_match and ack_match:
-                    status.req = int(req_match.group(1))
-                    status.ack = int(ack_match.group(1))
-
-            #on cherche Slice status
-            elif 'Slice:' in line:
-                match = re.search(r'Slice:\s+(\w+)', line)
-                if match:
-                    status.slice_status = match.group(1)
-        return status
\ No newline at end of file
+        if self.validate:
+            return parse_lines_validated(self._read_file())
+        return parse_lines(self._read_file())
\ No newline at end of file
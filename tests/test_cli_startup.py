@@ -0,0 +1,125 @@
+"""
+Tests de non-régression du temps de démarrage du CLI
+
+Le CLI est lancé une fois par port : on vérifie avec -X importtime que
+les modules lourds ne sont plus chargés au démarrage.
+"""
+
+import importlib.util
+import json
+import shutil
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+PROJECT_ROOT = Path(__file__).parent.parent
+CLI = PROJECT_ROOT / "src" / "check_port_cli.py"
+STATS_OK = PROJECT_ROOT / "fixtures" / "stats_ok.txt"
+
+# Modules qui ne doivent jamais être importés par le CLI
+HEAVY_MODULES = {"dataclasses", "inspect", "typing", "pathlib"}
+
+
+def imported_modules(*args):
+    """Lance une commande Python avec -X importtime et retourne les modules importés"""
+    cmd = subprocess.run(
+        [sys.executable, "-X", "importtime", *map(str, args)],
+        capture_output=True,
+        text=True,
+    )
+    modules = set()
+    for line in cmd.stderr.splitlines():
+        if line.startswith("import time:") and "|" in line:
+            modules.add(line.rsplit("|", 1)[1].strip())
+    return cmd, modules
+
+
+class TestCLIStartup:
+    """Tests du démarrage à froid du CLI"""
+
+    def test_no_heavy_imports(self):
+        """Test : Le CLI ne doit pas importer dataclasses, typing ou pathlib"""
+        cmd, modules = imported_modules(CLI, STATS_OK)
+        assert cmd.returncode == 0
+        assert json.loads(cmd.stdout)["can_restart"] is True
+        assert "port_checker" in modules
+        assert not modules & HEAVY_MODULES
+
+    def test_usage_does_not_load_checker(self):
+        """Test : Le message d'usage ne doit pas charger PortChecker"""
+        cmd, modules = imported_modules(CLI)
+        assert cmd.returncode == 1
+        assert "Usage:" in cmd.stdout
+        assert "port_checker" not in modules
+
+    def test_no_sys_path_probing(self):
+        """Test : L'import du CLI ne doit pas modifier sys.path"""
+        before = list(sys.path)
+        import src.check_port_cli  # noqa: F401
+        assert sys.path == before
+
+
+class TestBundle:
+    """Tests du zipapp construit par scripts/build_bundle.py"""
+
+    @pytest.fixture
+    def bundle(self, tmp_path):
+        cmd = subprocess.run(
+            [sys.executable, str(PROJECT_ROOT / "scripts" / "build_bundle.py"),
+             "--output", str(tmp_path / "check_port.pyz")],
+            capture_output=True,
+            text=True,
+        )
+        assert cmd.returncode == 0, cmd.stderr
+        return tmp_path / "check_port.pyz"
+
+    def test_bundle_runs(self, bundle):
+        """Test : Le zipapp doit produire le même résultat que le script"""
+        cmd = subprocess.run(
+            [sys.executable, str(bundle), str(STATS_OK)],
+            capture_output=True,
+            text=True,
+        )
+        assert cmd.returncode == 0
+        assert json.loads(cmd.stdout)["ratio"] == 95.74
+
+    def test_bundle_is_reproducible(self, bundle, tmp_path):
+        """Test : Deux constructions doivent donner les mêmes octets"""
+        first = bundle.read_bytes()
+        subprocess.run(
+            [sys.executable, str(PROJECT_ROOT / "scripts" / "build_bundle.py"),
+             "--output", str(bundle)],
+            check=True,
+            capture_output=True,
+        )
+        assert bundle.read_bytes() == first
+
+    def test_role_build_requires_version_bump(self, tmp_path):
+        """Test : Des sources modifiées sous la même version ne sont pas reconstruites"""
+        spec = importlib.util.spec_from_file_location(
+            "build_bundle", PROJECT_ROOT / "scripts" / "build_bundle.py"
+        )
+        build_bundle = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(build_bundle)
+
+        source_dir = tmp_path / "src"
+        shutil.copytree(PROJECT_ROOT / "src", source_dir)
+        bundle, vars_file = tmp_path / "check_port.pyz", tmp_path / "main.yml"
+        build_bundle.build_role(bundle, vars_file, source_dir)
+        assert build_bundle.check_role(bundle, vars_file, source_dir) == []
+
+        with open(source_dir / "port_checker.py", "a", encoding="utf-8") as f:
+            f.write("\n# modifié\n")
+        assert "sources de src/ modifiées sans changer __version__" in \
+            build_bundle.check_role(bundle, vars_file, source_dir)
+        with pytest.raises(ValueError):
+            build_bundle.build_role(bundle, vars_file, source_dir)
+
+        init = source_dir / "__init__.py"
+        init.write_text(init.read_text(encoding="utf-8").replace(
+            f'"{build_bundle.read_version(source_dir)}"', '"99.0.0"'
+        ), encoding="utf-8")
+        assert build_bundle.build_role(bundle, vars_file, source_dir)["version"] == "99.0.0"
+        assert build_bundle.check_role(bundle, vars_file, source_dir) == []
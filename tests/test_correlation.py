@@ -0,0 +1,162 @@
+"""
+Tests pour la corrélation des anomalies des sondes avec les décisions
+"""
+
+import ast
+import json
+import subprocess
+import sys
+
+import pytest
+from pathlib import Path
+from src import correlation
+from src.correlation import AnomalyIndex, correlate, parse_timestamp
+
+PROJECT_ROOT = Path(__file__).parent.parent
+
+
+@pytest.fixture
+def probes_csv(tmp_path):
+    """Mesures nettoyées de deux sondes, au format de donnees_propres.csv"""
+    path = tmp_path / "donnees_propres.csv"
+    path.write_text(
+        "timestamp,bandwidth_mbps,latency_ms,packet_loss,source\n"
+        "2025-07-02 10:00:00,90,150,0.02,olt-a\n"
+        "2025-07-02 10:05:00,95,210,0.01,olt-a\n"
+        "2025-07-02 10:10:00,5,180,0.05,olt-a\n"
+        "2025-07-02 09:00:00,92,180,8.5,olt-a\n"
+        "2025-07-02 10:12:00,92,180,8.5,sonde-b\n"
+        "2025-07-02 10:13:00,invalide,180,8.5,olt-a\n",
+        encoding="utf-8",
+    )
+    return path
+
+
+@pytest.fixture
+def results():
+    """Décisions au format de check_port_cli.py --batch"""
+    return [
+        {"olt": "olt-a", "port": "1/1/1", "can_restart": True, "nb_clients": 3},
+        {"olt": "olt-b", "port": "1/1/1", "can_restart": True, "nb_clients": 10},
+        {"olt": "olt-a", "port": "1/1/2", "can_restart": False, "nb_clients": 5},
+        {"olt": "olt-c", "port": "1/1/1", "can_restart": True, "nb_clients": 1},
+    ]
+
+
+class TestAnomalyIndex:
+    """Tests pour l'index des anomalies"""
+
+    def test_only_anomalies_are_indexed(self, probes_csv):
+        """Test : Seules les mesures anormales et valides sont indexées"""
+        index = AnomalyIndex.from_csv(probes_csv)
+        assert len(index) == 4
+
+    def test_window(self, probes_csv):
+        """Test : La fenêtre doit retourner les anomalies de la cible dans l'intervalle"""
+        index = AnomalyIndex.from_csv(probes_csv)
+        at = parse_timestamp("2025-07-02 10:15:00")
+
+        anomalies = index.window("olt-a", at, before=900)
+        assert [a.reasons for a in anomalies] == [["latence"], ["bande_passante"]]
+        assert index.window("olt-a", at, before=60) == []
+        assert index.window("inconnue", at, before=900) == []
+
+    def test_target_map(self, probes_csv):
+        """Test : Une sonde peut être rattachée à une OLT par correspondance"""
+        index = AnomalyIndex.from_csv(probes_csv, {"sonde-b": "olt-b"})
+        at = parse_timestamp("2025-07-02 10:15:00")
+        assert len(index.window("olt-b", at, before=900)) == 1
+
+
+class TestCorrelate:
+    """Tests pour la corrélation des décisions"""
+
+    def test_candidates_ranked_by_impact(self, probes_csv, results):
+        """Test : Les ports redémarrables sont classés par impact client"""
+        index = AnomalyIndex.from_csv(probes_csv, {"sonde-b": "olt-b"})
+        at = parse_timestamp("2025-07-02 10:15:00")
+
+        correlated = correlate(results, index, at, window=900)
+        assert [(r["olt"], r["impact"]) for r in correlated] == [
+            ("olt-b", 10), ("olt-a", 6), ("olt-c", 0), ("olt-a", 10)
+        ]
+        assert correlated[1]["probe_anomalies"][0]["timestamp"] == "2025-07-02 10:05:00"
+
+    def test_clients_zero_and_unknown(self, probes_csv):
+        """Test : Un port sans client n'a aucun impact, un nombre inconnu compte pour 1"""
+        index = AnomalyIndex.from_csv(probes_csv)
+        at = parse_timestamp("2025-07-02 10:15:00")
+        decisions = [
+            {"olt": "olt-a", "port": "1/1/1", "can_restart": True, "nb_clients": 0},
+            {"olt": "olt-a", "port": "1/1/2", "can_restart": True, "nb_clients": None},
+        ]
+
+        correlated = correlate(decisions, index, at, window=900)
+        assert [(r["port"], r["impact"]) for r in correlated] == [("1/1/2", 2), ("1/1/1", 0)]
+
+    def test_thresholds_match_traiter(self):
+        """Test : Les seuils doivent rester ceux de context_2/traiter.py"""
+        tree = ast.parse((PROJECT_ROOT / "context_2" / "traiter.py").read_text(encoding="utf-8"))
+        thresholds = {
+            node.targets[0].id: node.value.value
+            for node in tree.body
+            if isinstance(node, ast.Assign) and isinstance(node.targets[0], ast.Name)
+            and node.targets[0].id.startswith("SEUIL_")
+        }
+        assert thresholds == {
+            name: getattr(correlation, name) for name in thresholds
+        }
+        assert len(thresholds) == 3
+
+    def test_checked_at_overrides_default(self, probes_csv, results):
+        """Test : checked_at d'une décision remplace l'instant par défaut"""
+        index = AnomalyIndex.from_csv(probes_csv)
+        decision = dict(results[0], checked_at="2025-07-02 09:05:00")
+
+        correlated = correlate([decision], index, parse_timestamp("2025-07-02 10:15:00"))
+        assert [a["reasons"] for a in correlated[0]["probe_anomalies"]] == [["perte"]]
+
+    def test_cli(self, tmp_path, probes_csv, results):
+        """Test : Le script doit accepter un rapport de parc en entrée"""
+        report = tmp_path / "fleet_report.json"
+        report.write_text(json.dumps({"results": results}), encoding="utf-8")
+
+        cmd = subprocess.run(
+            [sys.executable, str(PROJECT_ROOT / "src" / "correlation.py"), str(report),
+             "--probes", str(probes_csv), "--at", "2025-07-02 10:15:00"],
+            capture_output=True,
+            text=True,
+        )
+        assert cmd.returncode == 0, cmd.stdout
+        correlated = json.loads(cmd.stdout)
+        assert correlated[0]["olt"] == "olt-a"
+        assert correlated[0]["impact"] == 6
+
+    def test_cli_compact_input(self, tmp_path, probes_csv):
+        """Test : Une sortie --compact garde nb_clients pour le classement par impact"""
+        stats = (PROJECT_ROOT / "fixtures" / "stats_ok.txt").read_text(encoding="utf-8")
+        (tmp_path / "petit.txt").write_text(stats, encoding="utf-8")
+        (tmp_path / "gros.txt").write_text(stats.replace("Nb clients: 3", "Nb clients: 40"),
+                                           encoding="utf-8")
+        ports = tmp_path / "ports.csv"
+        ports.write_text("olt,port,stats_file\nolt-a,1/1/1,petit.txt\nolt-a,1/1/2,gros.txt\n",
+                         encoding="utf-8")
+        compact = tmp_path / "compact.json"
+        compact.write_text(subprocess.run(
+            [sys.executable, str(PROJECT_ROOT / "src" / "check_port_cli.py"),
+             "--batch", str(ports), "--compact"],
+            capture_output=True,
+            text=True,
+        ).stdout, encoding="utf-8")
+
+        cmd = subprocess.run(
+            [sys.executable, str(PROJECT_ROOT / "src" / "correlation.py"), str(compact),
+             "--probes", str(probes_csv), "--at", "2025-07-02 10:15:00"],
+            capture_output=True,
+            text=True,
+        )
+        assert cmd.returncode == 0, cmd.stdout
+        correlated = json.loads(cmd.stdout)
+        assert [(r["port"], r["nb_clients"], r["impact"]) for r in correlated] == [
+            ("1/1/2", 40, 80), ("1/1/1", 3, 6)
+        ]
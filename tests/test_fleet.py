@@ -0,0 +1,229 @@
+"""
+Tests du mode parc : CLI --batch et playbook restart_fleet.yml
+Tests avec Testinfra
+"""
+
+import pytest
+import json
+import testinfra
+
+
+@pytest.fixture
+def host():
+    """Fixture pour se connecter en local"""
+    return testinfra.get_host("local://")
+
+
+@pytest.fixture
+def project_root(host):
+    """Retourne le chemin absolu du projet"""
+    return host.run("pwd").stdout.strip()
+
+
+@pytest.fixture
+def fake_restart(host):
+    """Crée un faux oltchiprzt.pl qui journalise ses appels"""
+    script_path = "/tmp/fake_oltchiprzt.pl"
+    calls_path = "/tmp/fake_oltchiprzt.calls"
+    host.run(f"""cat > {script_path} << 'EOF'
+#!/bin/bash
+echo "$@" >> {calls_path}
+echo "Port redemarre: $@"
+exit 0
+EOF""")
+    host.run(f"chmod +x {script_path}")
+    host.run(f"rm -f {calls_path}")
+
+    yield {"script": script_path, "calls": calls_path}
+
+    host.run(f"rm -f {script_path} {calls_path}")
+
+
+class TestBatchCLI:
+    """Tests du mode --batch du CLI"""
+
+    def test_batch_from_csv(self, host, project_root):
+        """Test : Le mode batch doit retourner un résultat par ligne du CSV"""
+        cmd = host.run(f"cd {project_root} && python3 src/check_port_cli.py --batch fixtures/fleet.csv")
+
+        assert cmd.rc == 0
+        results = json.loads(cmd.stdout)
+        assert [r["port"] for r in results] == ["1/1/1", "1/1/2", "1/1/1"]
+        assert [r["can_restart"] for r in results] == [True, False, False]
+        assert results[0]["olt"] == "olt-test-01"
+
+    def test_batch_paths_relative_to_csv(self, host, project_root):
+        """Test : Les stats_file relatifs doivent partir du dossier du CSV"""
+        cmd = host.run(f"cd /tmp && python3 {project_root}/src/check_port_cli.py "
+                       f"--batch {project_root}/fixtures/fleet.csv")
+
+        assert cmd.rc == 0
+        results = json.loads(cmd.stdout)
+        assert [r["can_restart"] for r in results] == [True, False, False]
+        assert results[0]["stats_file"] == "stats_ok.txt"
+
+    def test_batch_from_stdin(self, host, project_root):
+        """Test : Le mode batch doit lire le CSV sur l'entrée standard"""
+        cmd = host.run(
+            f"printf 'olt,port,stats_file\\nolt-a,1/1/1,{project_root}/fixtures/stats_pon_fail.txt\\n'"
+            f" | python3 {project_root}/src/check_port_cli.py --batch -"
+        )
+
+        assert cmd.rc == 0
+        results = json.loads(cmd.stdout)
+        assert len(results) == 1
+        assert "PON Power FAIL" in results[0]["message"]
+
+    def test_batch_missing_file_is_reported(self, host, project_root):
+        """Test : Un fichier absent ne doit pas interrompre le lot"""
+        cmd = host.run(
+            "printf 'olt,port,stats_file\\nolt-a,1/1/1,/foo/inexistant.txt\\n'"
+            f" | python3 {project_root}/src/check_port_cli.py --batch -"
+        )
+
+        assert cmd.rc == 0
+        result = json.loads(cmd.stdout)[0]
+        assert result["can_restart"] is False
+        assert "Erreur" in result["message"]
+
+    def test_batch_malformed_rows_are_reported(self, host, project_root):
+        """Test : Une ligne au mauvais nombre de colonnes ne doit pas interrompre le lot"""
+        cmd = host.run(
+            "printf 'olt,port,stats_file\\nolt-a,1/1/1\\n"
+            f"olt-a,1/1/2,{project_root}/fixtures/stats_ok.txt\\n"
+            f"olt-a,1/1/3,{project_root}/fixtures/stats_ok.txt,extra\\n'"
+            f" | python3 {project_root}/src/check_port_cli.py --batch -"
+        )
+
+        assert cmd.rc == 0
+        results = json.loads(cmd.stdout)
+        assert [r["reason_code"] for r in results] == [14, 0, 14]
+        assert [r["port"] for r in results] == ["1/1/1", "1/1/2", "1/1/3"]
+        assert "ligne 2" in results[0]["message"]
+        assert results[2]["can_restart"] is False
+
+    def test_batch_missing_columns(self, host, project_root):
+        """Test : Le mode batch doit échouer si le CSV n'a pas les bonnes colonnes"""
+        cmd = host.run(f"printf 'a,b\\n1,2\\n' | python3 {project_root}/src/check_port_cli.py --batch -")
+
+        assert cmd.rc == 1
+        assert "Colonnes manquantes" in json.loads(cmd.stdout)["message"]
+
+
+class TestFleetPlaybook:
+    """Tests du playbook de parc"""
+
+    def test_fleet_playbook_syntax(self, host):
+        """Test : Le playbook de parc doit avoir une syntaxe valide"""
+        cmd = host.run("ansible-playbook --syntax-check playbooks/restart_fleet.yml")
+        assert cmd.rc == 0
+
+    def test_fleet_restarts_only_approved_ports(self, host, fake_restart):
+        """Test : Seuls les ports autorisés sont redémarrés, rapport agrégé écrit"""
+        report_path = "/tmp/test_fleet_report.json"
+        cmd = host.run(
+            "ansible-playbook playbooks/restart_fleet.yml "
+            "-e 'fleet_csv=fixtures/fleet.csv' "
+            f"-e 'olt_restart_command={fake_restart['script']}' "
+            f"-e 'fleet_report_file={report_path}' "
+            "-e 'fleet_serial=1' "
+            "-e 'temp_dir=/tmp/test_fleet_bundle'"
+        )
+
+        assert cmd.rc == 0, f"Playbook failed: {cmd.stdout}"
+        assert host.file(fake_restart["calls"]).content_string.splitlines() == [
+            "-h olt-test-01 -p 1/1/1"
+        ]
+
+        report = json.loads(host.file(report_path).content_string)
+        assert report["summary"]["olts"] == 2
+        assert report["summary"]["ports"] == 3
+        assert report["summary"]["approved"] == 1
+        assert report["summary"]["blocked"] == 2
+        assert report["summary"]["restarted"] == 1
+        assert report["summary"]["olts_failed"] == []
+        restarted = [r for r in report["results"] if r["restarted"]]
+        assert restarted[0]["olt"] == "olt-test-01"
+        assert restarted[0]["restart_rc"] == 0
+
+        host.run(f"rm -rf {report_path} /tmp/test_fleet_bundle")
+
+    def test_fleet_skip_restart(self, host, fake_restart):
+        """Test : skip_restart doit produire le rapport sans redémarrer"""
+        report_path = "/tmp/test_fleet_report_skip.json"
+        cmd = host.run(
+            "ansible-playbook playbooks/restart_fleet.yml "
+            "-e 'fleet_csv=fixtures/fleet.csv' "
+            f"-e 'olt_restart_command={fake_restart['script']}' "
+            f"-e 'fleet_report_file={report_path}' "
+            "-e 'skip_restart=true' "
+            "-e 'temp_dir=/tmp/test_fleet_bundle'"
+        )
+
+        assert cmd.rc == 0, f"Playbook failed: {cmd.stdout}"
+        assert not host.file(fake_restart["calls"]).exists
+
+        report = json.loads(host.file(report_path).content_string)
+        assert report["summary"]["approved"] == 1
+        assert report["summary"]["restarted"] == 0
+
+        host.run(f"rm -rf {report_path} /tmp/test_fleet_bundle")
+
+
+class TestRemoteCollection:
+    """Tests du mode collecte (analyse sur l'hôte qui détient les stats)"""
+
+    def test_batch_compact_records(self, host, project_root):
+        """Test : Le mode compact doit retourner des enregistrements de quelques dizaines d'octets"""
+        cmd = host.run(f"cd {project_root} && python3 src/check_port_cli.py --batch fixtures/fleet.csv --compact")
+
+        assert cmd.rc == 0
+        output = json.loads(cmd.stdout)
+        assert output["fields"][:3] == ["olt", "port", "can_restart"]
+        assert len(output["records"]) == 3
+        record = dict(zip(output["fields"], output["records"][0]))
+        assert record["can_restart"] == 1
+        assert record["error"] is None
+        assert all(len(json.dumps(r, separators=(",", ":"))) < 64 for r in output["records"])
+
+    def test_batch_only_blocked(self, host, project_root):
+        """Test : --only-blocked ne doit retourner que les ports bloqués"""
+        cmd = host.run(
+            f"cd {project_root} && python3 src/check_port_cli.py --batch fixtures/fleet.csv --compact --only-blocked"
+        )
+
+        assert cmd.rc == 0
+        records = json.loads(cmd.stdout)["records"]
+        assert [(r[0], r[1]) for r in records] == [("olt-test-01", "1/1/2"), ("olt-test-02", "1/1/1")]
+
+    def test_batch_unknown_option(self, host, project_root):
+        """Test : Une option inconnue doit afficher l'usage"""
+        cmd = host.run(f"cd {project_root} && python3 src/check_port_cli.py --batch fixtures/fleet.csv --foo")
+
+        assert cmd.rc == 1
+        assert "Usage:" in cmd.stdout
+
+    def test_collect_playbook_syntax(self, host):
+        """Test : Le playbook de collecte doit avoir une syntaxe valide"""
+        cmd = host.run("ansible-playbook --syntax-check playbooks/collect_fleet.yml")
+        assert cmd.rc == 0
+
+    def test_collect_only_blocked(self, host):
+        """Test : La collecte ne doit remonter que les ports bloqués"""
+        report_path = "/tmp/test_collect_report.json"
+        cmd = host.run(
+            "ansible-playbook playbooks/collect_fleet.yml "
+            "-e 'fleet_csv=fixtures/fleet.csv' "
+            "-e 'olt_collect_only_blocked=true' "
+            f"-e 'collect_report_file={report_path}' "
+            "-e 'temp_dir=/tmp/test_collect_bundle'"
+        )
+
+        assert cmd.rc == 0, f"Playbook failed: {cmd.stdout}"
+        report = json.loads(host.file(report_path).content_string)
+        assert report["summary"]["ports"] == 2
+        assert report["summary"]["blocked"] == 2
+        assert report["summary"]["olts_failed"] == []
+        assert {r["pon_power"] for r in report["results"]} == {"FAIL", "GOOD"}
+
+        host.run(f"rm -rf {report_path} /tmp/test_collect_bundle")
@@ -0,0 +1,250 @@
+"""
+Tests de l'exposition des métriques (registre, textfile, serveur HTTP)
+"""
+
+import json
+import subprocess
+import sys
+import threading
+import urllib.request
+from pathlib import Path
+
+import pytest
+
+from src.metrics import (
+    CONTENT_TYPE,
+    Exporter,
+    MetricsRegistry,
+    record_port_results,
+    write_textfile,
+)
+
+PROJECT_ROOT = Path(__file__).parent.parent
+CLI = PROJECT_ROOT / "src" / "check_port_cli.py"
+FIXTURES = PROJECT_ROOT / "fixtures"
+
+RESULTS = [
+    {"olt": "olt-a", "port": "1/1/1", "can_restart": True, "reason_code": 0, "pon_power": "GOOD",
+     "ratio": 95.74, "slice_status": "ONLINE", "nb_clients": 3},
+    {"olt": "olt-a", "port": "1/1/2", "can_restart": False, "reason_code": 1, "pon_power": "FAIL",
+     "ratio": 95.74, "slice_status": "ONLINE", "nb_clients": 3},
+    {"olt": "olt-b", "port": "1/1/1", "can_restart": False, "reason_code": 11,
+     "message": "Erreur : Le fichier x n'existe pas"},
+]
+
+
+def samples(text):
+    """Échantillons d'une exposition : {ligne sans la valeur: valeur}"""
+    parsed = {}
+    for line in text.splitlines():
+        if line and not line.startswith("#"):
+            series, _, value = line.rpartition(" ")
+            parsed[series] = float(value)
+    return parsed
+
+
+class TestRegistry:
+    """Tests du registre de métriques"""
+
+    def test_render_openmetrics(self):
+        """Test : Jauges, compteurs et résumés au format OpenMetrics"""
+        registry = MetricsRegistry()
+        registry.describe("olt_test_gauge", "gauge", "Jauge")
+        registry.describe("olt_test_events", "counter", "Compteur")
+        registry.describe("olt_test_duration_seconds", "summary", "Durée")
+        registry.set("olt_test_gauge", 2.5, olt='a"b')
+        registry.inc("olt_test_events")
+        registry.inc("olt_test_events", 2)
+        registry.observe("olt_test_duration_seconds", 0.5)
+
+        text = registry.render()
+        assert text.endswith("# EOF\n")
+        assert "# TYPE olt_test_events counter" in text
+        values = samples(text)
+        assert values['olt_test_gauge{olt="a\\"b"}'] == 2.5
+        assert values["olt_test_events_total"] == 3
+        assert values["olt_test_duration_seconds_count"] == 1
+
+    def test_undeclared_metric(self):
+        """Test : Une métrique non déclarée est refusée"""
+        with pytest.raises(ValueError):
+            MetricsRegistry().set("olt_inconnue", 1)
+
+    def test_bounded(self):
+        """Test : Au-delà de max_series, les séries les plus anciennes sont évincées"""
+        registry = MetricsRegistry(max_series=10)
+        registry.describe("olt_test_gauge", "gauge", "Jauge")
+        for index in range(25):
+            registry.set("olt_test_gauge", index, port=str(index))
+        registry.set("olt_test_gauge", 99, port="20")
+
+        assert len(registry) == 10
+        assert registry.evicted == 15
+        values = samples(registry.render())
+        assert 'olt_test_gauge{port="14"}' not in values
+        assert values['olt_test_gauge{port="20"}'] == 99
+
+    def test_concurrent_updates(self):
+        """Test : Les lectures restent cohérentes pendant des mises à jour concurrentes"""
+        registry = MetricsRegistry()
+        registry.describe("olt_test_events", "counter", "Compteur")
+        registry.describe("olt_test_duration_seconds", "summary", "Durée")
+
+        def worker():
+            for _ in range(2000):
+                registry.inc("olt_test_events")
+                registry.observe("olt_test_duration_seconds", 1.0)
+
+        threads = [threading.Thread(target=worker) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        while any(thread.is_alive() for thread in threads):
+            values = samples(registry.render())
+            # _sum et _count sont mis à jour sous le même verrou
+            assert values.get("olt_test_duration_seconds_sum") == values.get("olt_test_duration_seconds_count")
+        for thread in threads:
+            thread.join()
+
+        assert samples(registry.render())["olt_test_events_total"] == 8000
+
+
+class TestPortMetrics:
+    """Tests des métriques par port"""
+
+    def test_record_port_results(self):
+        """Test : Chaque port publie ratio, PON-Power, slice et can_restart"""
+        registry = MetricsRegistry()
+        record_port_results(registry, RESULTS)
+        values = samples(registry.render())
+
+        assert values['olt_port_ratio_percent{olt="olt-a",port="1/1/1"}'] == 95.74
+        assert values['olt_port_can_restart{olt="olt-a",port="1/1/1"}'] == 1
+        assert values['olt_port_pon_power_good{olt="olt-a",port="1/1/2"}'] == 0
+        assert values['olt_port_slice_online{olt="olt-a",port="1/1/2"}'] == 1
+        assert values['olt_port_reason_code{olt="olt-b",port="1/1/1"}'] == 11
+        assert 'olt_port_ratio_percent{olt="olt-b",port="1/1/1"}' not in values
+
+    def test_unread_fields_not_published(self):
+        """Test : Un port aux données illisibles ne publie ni ratio, ni PON-Power, ni slice"""
+        provenance = {"pon_power": {"line": 2, "offset": 9}, "ack": {"line": 4, "offset": 70},
+                      "req": {"line": 4, "offset": 70}}
+        registry = MetricsRegistry()
+        record_port_results(registry, [
+            # REQ de plus de 64 bits : reason_code 5, valeurs par défaut
+            {"olt": "olt-a", "port": "1/1/1", "can_restart": False, "reason_code": 5,
+             "pon_power": "GOOD", "ratio": 0.0, "slice_status": "OFFLINE"},
+            # slice_status absent de la provenance : seule cette jauge est omise
+            {"olt": "olt-a", "port": "1/1/2", "can_restart": False, "reason_code": 3,
+             "pon_power": "GOOD", "ratio": 96.0, "slice_status": "OFFLINE",
+             "parse": {"provenance": provenance, "issues": []}},
+        ])
+        values = samples(registry.render())
+
+        assert values['olt_port_reason_code{olt="olt-a",port="1/1/1"}'] == 5
+        for name in ("olt_port_ratio_percent", "olt_port_pon_power_good", "olt_port_slice_online"):
+            assert f'{name}{{olt="olt-a",port="1/1/1"}}' not in values
+        assert values['olt_port_ratio_percent{olt="olt-a",port="1/1/2"}'] == 96.0
+        assert 'olt_port_slice_online{olt="olt-a",port="1/1/2"}' not in values
+
+    def test_cli_oversized_counter_metrics(self, tmp_path):
+        """Test : Un compteur de plus de 64 bits ne publie pas un ratio à 0"""
+        stats = (FIXTURES / "stats_ok.txt").read_text(encoding="utf-8")
+        stats_file = tmp_path / "stats.txt"
+        stats_file.write_text(stats.replace("188", str(2**64)), encoding="utf-8")
+        path = tmp_path / "batch.prom"
+        cmd = subprocess.run(
+            [sys.executable, str(CLI), "--metrics-file", str(path), "--batch", "-"],
+            input=f"olt,port,stats_file\nolt-a,1/1/1,{stats_file}\n",
+            capture_output=True,
+            text=True,
+        )
+        assert json.loads(cmd.stdout)[0]["reason_code"] == 5
+        values = samples(path.read_text(encoding="utf-8"))
+        assert values['olt_port_reason_code{olt="olt-a",port="1/1/1"}'] == 5
+        assert 'olt_port_ratio_percent{olt="olt-a",port="1/1/1"}' not in values
+        assert 'olt_port_slice_online{olt="olt-a",port="1/1/1"}' not in values
+
+    def test_textfile(self, tmp_path):
+        """Test : Le fichier .prom est écrit en entier, sans fichier temporaire restant"""
+        registry = MetricsRegistry()
+        record_port_results(registry, RESULTS)
+        path = tmp_path / "olt.prom"
+        write_textfile(registry, path)
+        assert path.read_text(encoding="utf-8") == registry.render()
+        assert [p.name for p in tmp_path.iterdir()] == ["olt.prom"]
+
+    def test_cli_metrics_file(self, tmp_path):
+        """Test : --metrics-file écrit l'état des ports et la durée de l'exécution"""
+        path = tmp_path / "batch.prom"
+        cmd = subprocess.run(
+            [sys.executable, str(CLI), "--metrics-file", str(path), "--batch", "-", "--compact"],
+            input=f"olt,port,stats_file\nolt-a,1/1/1,{FIXTURES / 'stats_ok.txt'}\n",
+            capture_output=True,
+            text=True,
+        )
+        assert cmd.returncode == 0
+        assert json.loads(cmd.stdout)["records"][0][2] == 1
+        values = samples(path.read_text(encoding="utf-8"))
+        assert values['olt_port_can_restart{olt="olt-a",port="1/1/1"}'] == 1
+        assert values['olt_tool_last_run_ports{tool="check_port_cli"}'] == 1
+
+
+class TestExporter:
+    """Tests du serveur HTTP"""
+
+    def test_http_endpoint(self, tmp_path):
+        """Test : /metrics sert les résultats et les fichiers .prom inclus"""
+        results = tmp_path / "fleet_report.json"
+        results.write_text(json.dumps({"summary": {}, "results": RESULTS}), encoding="utf-8")
+        probes = tmp_path / "metriques_sondes.prom"
+        probes.write_text("# TYPE probe_latency_ms gauge\nprobe_latency_ms{source=\"paris\"} 180\n")
+
+        exporter = Exporter([results], [probes])
+        exporter.refresh()
+        server = exporter.serve("127.0.0.1", 0)
+        try:
+            url = f"http://127.0.0.1:{server.server_address[1]}/metrics"
+            with urllib.request.urlopen(url, timeout=5) as response:
+                assert response.headers["Content-Type"] == CONTENT_TYPE
+                text = response.read().decode("utf-8")
+        finally:
+            server.shutdown()
+
+        values = samples(text)
+        assert values['olt_port_can_restart{olt="olt-a",port="1/1/1"}'] == 1
+        assert values['probe_latency_ms{source="paris"}'] == 180
+        assert values["olt_exporter_scrapes_total"] == 1
+        assert text.endswith("# EOF\n")
+
+    def test_refresh_drops_stale_ports(self, tmp_path):
+        """Test : Un port retiré ou devenu illisible cesse de publier ses mesures"""
+        results = tmp_path / "fleet_report.json"
+        results.write_text(json.dumps(RESULTS[:2]), encoding="utf-8")
+        exporter = Exporter([results])
+        exporter.refresh()
+        assert 'olt_port_ratio_percent{olt="olt-a",port="1/1/2"}' in samples(exporter.render())
+
+        unreadable = {"olt": "olt-a", "port": "1/1/1", "can_restart": False, "reason_code": 11}
+        results.write_text(json.dumps([unreadable]), encoding="utf-8")
+        exporter.refresh()
+        values = samples(exporter.render())
+        assert not any('port="1/1/2"' in series for series in values)
+        assert 'olt_port_ratio_percent{olt="olt-a",port="1/1/1"}' not in values
+        assert values['olt_port_reason_code{olt="olt-a",port="1/1/1"}'] == 11
+
+    def test_refresh_keeps_last_good_results(self, tmp_path):
+        """Test : Un fichier de résultats corrompu garde ses derniers résultats lus"""
+        results = tmp_path / "fleet_report.json"
+        results.write_text(json.dumps(RESULTS), encoding="utf-8")
+        exporter = Exporter([results])
+        exporter.refresh()
+
+        results.write_text("{tronqué", encoding="utf-8")
+        exporter.refresh()
+        values = samples(exporter.render())
+        assert values['olt_port_can_restart{olt="olt-a",port="1/1/1"}'] == 1
+        assert values[f'olt_exporter_refresh_errors_total{{source="{results}"}}'] == 1
+
+        results.unlink()
+        exporter.refresh()
+        assert not any(series.startswith("olt_port_") for series in samples(exporter.render()))
@@ -0,0 +1,155 @@
+"""
+Tests du format de sortie du CLI : schéma versionné, codes de raison et encodeurs
+"""
+
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from src.check_port_cli import (
+    COMPACT_FIELDS,
+    ERROR_FILE_NOT_FOUND,
+    ERROR_USAGE,
+    SCHEMA_VERSION,
+    load_encoder,
+)
+from src.port_checker import (
+    REASON_MISSING_DATA,
+    REASON_OK,
+    REASON_PON_POWER,
+    REASON_RATIO,
+    REASON_SLICE,
+    PortStatus,
+)
+
+PROJECT_ROOT = Path(__file__).parent.parent
+CLI = PROJECT_ROOT / "src" / "check_port_cli.py"
+FIXTURES = PROJECT_ROOT / "fixtures"
+SCHEMA = PROJECT_ROOT / "schemas" / f"port_check_result.v{SCHEMA_VERSION}.json"
+
+
+def run_cli(*args, stdin=None):
+    """Lance le CLI et retourne le processus terminé (sortie en octets)"""
+    return subprocess.run(
+        [sys.executable, str(CLI), *map(str, args)],
+        capture_output=True,
+        input=stdin,
+    )
+
+
+class TestReasonCodes:
+    """Tests des codes de raison de PortStatus"""
+
+    @pytest.mark.parametrize("status, expected", [
+        (PortStatus("GOOD", 180, 188, "ONLINE"), REASON_OK),
+        (PortStatus("FAIL", 180, 188, "ONLINE"), REASON_PON_POWER),
+        (PortStatus("GOOD", 180, 200, "ONLINE"), REASON_RATIO),
+        (PortStatus("GOOD", 180, 188, "OFFLINE"), REASON_SLICE),
+    ])
+    def test_reason_code(self, status, expected):
+        """Test : Chaque cause de blocage doit avoir son code"""
+        assert status.reason_code == expected
+        assert status.to_dict()["reason_code"] == expected
+
+    def test_reason_code_follows_block_reason(self):
+        """Test : Le code doit suivre la même priorité que le message"""
+        status = PortStatus("FAIL", 0, 200, "OFFLINE")
+        assert status.reason_code == REASON_PON_POWER
+        assert "PON Power" in status.block_reason
+
+
+class TestOutputSchema:
+    """Tests de la sortie du CLI"""
+
+    @pytest.mark.parametrize("fixture, expected", [
+        ("stats_ok.txt", REASON_OK),
+        ("stats_pon_fail.txt", REASON_PON_POWER),
+        ("stats_ratio_low.txt", REASON_RATIO),
+    ])
+    def test_result_carries_schema_and_code(self, fixture, expected):
+        """Test : Chaque résultat doit porter schema_version et reason_code"""
+        result = json.loads(run_cli(FIXTURES / fixture).stdout)
+        assert result["schema_version"] == SCHEMA_VERSION
+        assert result["reason_code"] == expected
+        assert result["can_restart"] is (expected == REASON_OK)
+
+    def test_error_codes(self):
+        """Test : Les erreurs du CLI doivent avoir un code stable"""
+        assert json.loads(run_cli().stdout)["reason_code"] == ERROR_USAGE
+        missing = json.loads(run_cli("/foo/inexistant.txt").stdout)
+        assert missing["reason_code"] == ERROR_FILE_NOT_FOUND
+        assert missing["schema_version"] == SCHEMA_VERSION
+
+    def test_accents_are_not_escaped(self):
+        """Test : Tous les messages doivent sortir en UTF-8 sans échappement"""
+        blocked = run_cli(FIXTURES / "stats_pon_fail.txt").stdout
+        batch = run_cli("--batch", "-", stdin=b"olt,port,stats_file\na,1,/foo/x.txt\n").stdout
+        assert "Redémarrage".encode("utf-8") in blocked
+        assert b"\\u00e9" not in blocked + batch
+
+    def test_compact_fields_match_schema(self):
+        """Test : Les champs compacts doivent être ceux du schéma publié"""
+        schema = json.loads(SCHEMA.read_text(encoding="utf-8"))
+        assert tuple(schema["$defs"]["compact"]["properties"]["fields"]["const"]) == COMPACT_FIELDS
+
+        cmd = run_cli("--batch", FIXTURES / "fleet.csv", "--compact", stdin=b"")
+        output = json.loads(cmd.stdout)
+        assert output["schema_version"] == SCHEMA_VERSION
+        codes = [dict(zip(output["fields"], record))["reason_code"] for record in output["records"]]
+        assert codes == [REASON_OK, REASON_PON_POWER, REASON_RATIO]
+
+    def test_missing_data_has_its_own_code(self, tmp_path):
+        """Test : Un fichier incomplet ne doit pas être bloqué pour ratio bas"""
+        stats = tmp_path / "incomplet.txt"
+        stats.write_text("* Stats:\n    * Port: NNI-Link UP - PON-Power GOOD\n    * Slice: ONLINE\n")
+        result = json.loads(run_cli(stats).stdout)
+        assert result["reason_code"] == REASON_MISSING_DATA
+        assert result["parse"]["provenance"]["pon_power"] == {"line": 2, "offset": 9}
+        assert [issue["field"] for issue in result["parse"]["issues"]] == ["req", "ack"]
+
+    def test_counter_over_64_bits_is_malformed(self, tmp_path):
+        """Test : Un compteur de plus de 64 bits est illisible, pas un crash du lot"""
+        stats = tmp_path / "enorme.txt"
+        stats.write_text((FIXTURES / "stats_ok.txt").read_text(encoding="utf-8").replace(
+            "188 REQ", "99999999999999999999 REQ"
+        ))
+        result = json.loads(run_cli(stats).stdout)
+        assert result["reason_code"] == REASON_MISSING_DATA
+        assert {"kind": "malformed", "field": "req", "lines": [4]} in result["parse"]["issues"]
+
+        batch = run_cli("--batch", "-", stdin=f"olt,port,stats_file\na,1,{stats}\n".encode())
+        assert batch.returncode == 0
+        assert json.loads(batch.stdout)[0]["reason_code"] == REASON_MISSING_DATA
+
+    def test_unknown_format_is_usage_error(self):
+        """Test : Un format inconnu doit être refusé"""
+        cmd = run_cli("--format", "xml", FIXTURES / "stats_ok.txt")
+        assert cmd.returncode == 1
+        assert json.loads(cmd.stdout)["reason_code"] == ERROR_USAGE
+
+
+class TestEncoders:
+    """Tests des encodeurs JSON et MessagePack"""
+
+    def test_json_encoder_matches_stdlib(self):
+        """Test : L'encodeur retenu (orjson ou json) doit produire le même JSON"""
+        result = PortStatus("FAIL", 180, 188, "ONLINE").to_dict()
+        expected = json.dumps(result, ensure_ascii=False, separators=(",", ":")) + "\n"
+        assert load_encoder()(result) == expected.encode("utf-8")
+
+    def test_json_encoder_falls_back_to_stdlib(self):
+        """Test : Ce qu'orjson refuse (entier > 64 bits) est encodé par json"""
+        result = {"req": 2**70, "message": "Redémarrage"}
+        expected = json.dumps(result, ensure_ascii=False, separators=(",", ":")) + "\n"
+        assert load_encoder()(result) == expected.encode("utf-8")
+
+    def test_msgpack_output(self):
+        """Test : --format msgpack doit produire le même résultat en binaire"""
+        msgpack = pytest.importorskip("msgpack")
+        cmd = run_cli("--format", "msgpack", FIXTURES / "stats_ok.txt")
+        assert cmd.returncode == 0
+        result = msgpack.unpackb(cmd.stdout)
+        assert result == json.loads(run_cli(FIXTURES / "stats_ok.txt").stdout)
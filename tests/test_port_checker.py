@@ -2,9 +2,21 @@
 Tests unitaires pour le vérificateur de port OLT
 """
 
+import tarfile
+
 import pytest
 from pathlib import Path
-from src.port_checker import PortChecker, PortStatus
+from src.port_checker import (
+    REASON_CONFLICTING_DATA,
+    REASON_MISSING_DATA,
+    REASON_NOT_STATS,
+    REASON_OK,
+    PortChecker,
+    PortStatus,
+    detect_compression,
+    iter_archive,
+    parse_lines_validated,
+)
 
 @pytest.fixture
 def fixtures_dir():
@@ -62,6 +74,12 @@ class TestPortChecker:
         assert status.slice_status == "ONLINE"
 
 
+    def test_parse_nb_clients(self, stats_ok_file):
+        """Test: Doit extraire le nombre de clients du port"""
+        checker = PortChecker(stats_ok_file)
+        status = checker.check()
+        assert status.nb_clients == 3
+
     def test_can_restart_all_conditions_ok(self, stats_ok_file):
         """Test: Peut redémarer le port si tout est OK"""
         checker = PortChecker(stats_ok_file)
@@ -117,4 +135,174 @@ class TestPortStatus:
         result = status.to_dict()
         assert isinstance(result, dict)
         assert result["pon_power"] == "GOOD"
-        assert result["can_restart"] is True
\ No newline at end of file
+        assert result["can_restart"] is True
+
+class TestCompressedInput:
+    """Tests pour la lecture des fichiers compressés et des archives"""
+
+    @pytest.fixture
+    def stats_content(self, stats_ok_file):
+        return stats_ok_file.read_bytes()
+
+    @pytest.mark.parametrize("module_name,suffix,compression", [
+        ("gzip", ".gz", "gzip"),
+        ("lzma", ".xz", "xz"),
+        ("bz2", ".bz2", "bz2"),
+    ])
+    def test_check_compressed_file(self, tmp_path, stats_content, module_name, suffix, compression):
+        """Test : Doit décompresser le fichier à la volée"""
+        module = pytest.importorskip(module_name)
+        compressed = tmp_path / f"stats{suffix}"
+        compressed.write_bytes(module.compress(stats_content))
+
+        checker = PortChecker(compressed)
+        status = checker.check()
+        assert checker.compression == compression
+        assert status.can_restart is True
+        assert status.ack == 180
+
+    def test_check_zstd_file(self, tmp_path, stats_content):
+        """Test : Doit lire un fichier .zst si zstandard est installé"""
+        zstandard = pytest.importorskip("zstandard")
+        compressed = tmp_path / "stats.zst"
+        compressed.write_bytes(zstandard.ZstdCompressor().compress(stats_content))
+
+        status = PortChecker(compressed).check()
+        assert status.pon_power == "GOOD"
+        assert status.req == 188
+
+    def test_plain_file_not_compressed(self, stats_ok_file):
+        """Test : Un fichier texte n'est pas détecté comme compressé"""
+        assert detect_compression(stats_ok_file) is None
+
+    def test_iter_archive(self, tmp_path, fixtures_dir):
+        """Test : Doit parcourir une archive tar.gz sans l'extraire"""
+        archive = tmp_path / "stats.tar.gz"
+        with tarfile.open(archive, "w:gz") as tar:
+            for name in ("stats_ok.txt", "stats_pon_fail.txt", "stats_ratio_low.txt"):
+                tar.add(fixtures_dir / name, arcname=name)
+
+        results = dict(iter_archive(archive))
+        assert set(results) == {"stats_ok.txt", "stats_pon_fail.txt", "stats_ratio_low.txt"}
+        assert results["stats_ok.txt"].can_restart is True
+        assert results["stats_pon_fail.txt"].pon_power == "FAIL"
+        assert results["stats_ratio_low.txt"].ratio == 90.0
+        assert not any(tmp_path.glob("*.txt"))
+
+
+class TestValidatedParsing:
+    """Tests de l'analyse avec validation (provenance et anomalies)"""
+
+    def lines(self, *body):
+        return ["* Stats:\n", *(f"    * {line}\n" for line in body)]
+
+    def test_valid_file_provenance(self, stats_ok_file):
+        """Test : Chaque champ lu doit garder sa ligne et son offset"""
+        status = PortChecker(stats_ok_file, validate=True).check()
+        assert status.can_restart is True
+        assert status.reason_code == REASON_OK
+        assert status.report.issues == []
+        assert status.report.provenance["pon_power"] == (2, 9)
+        assert status.report.provenance["req"] == status.report.provenance["ack"]
+        with open(stats_ok_file, "rb") as f:
+            f.seek(status.report.provenance["slice_status"][1])
+            assert b"Slice: ONLINE" in f.readline()
+
+    def test_missing_counters_are_not_a_low_ratio(self):
+        """Test : Des compteurs absents ne doivent pas passer pour un ratio bas"""
+        status = parse_lines_validated(self.lines("Port: NNI-Link UP - PON-Power GOOD", "Slice: ONLINE"))
+        assert status.can_restart is False
+        assert status.reason_code == REASON_MISSING_DATA
+        assert "données manquantes (req, ack)" in status.block_reason
+
+    def test_malformed_line(self):
+        """Test : Une ligne illisible est signalée avec son numéro"""
+        status = parse_lines_validated(self.lines(
+            "Port: NNI-Link UP - PON-Power GOOD",
+            "MpcpPortRegister: ?? REQ - 180 ACK",
+            "Slice: ONLINE",
+        ))
+        kinds = {(issue.kind, issue.field): issue.lines for issue in status.report.issues}
+        assert kinds[("malformed", "req")] == [3]
+        assert kinds[("missing", "req")] == []
+        assert status.ack == 180
+        assert status.reason_code == REASON_MISSING_DATA
+
+    def test_duplicate_is_not_blocking(self):
+        """Test : Un champ répété avec la même valeur est signalé sans bloquer"""
+        status = parse_lines_validated(self.lines(
+            "Port: NNI-Link UP - PON-Power GOOD",
+            "MpcpPortRegister: 188 REQ - 180 ACK",
+            "Slice: ONLINE",
+            "Slice: ONLINE",
+        ))
+        assert [(i.kind, i.field, i.lines) for i in status.report.issues] == [
+            ("duplicate", "slice_status", [4, 5])
+        ]
+        assert status.can_restart is True
+
+    def test_conflict_blocks(self):
+        """Test : Des valeurs contradictoires bloquent, la première est gardée"""
+        status = parse_lines_validated(self.lines(
+            "Port: NNI-Link UP - PON-Power GOOD",
+            "MpcpPortRegister: 188 REQ - 180 ACK",
+            "Port: NNI-Link UP - PON-Power FAIL",
+            "Slice: ONLINE",
+        ))
+        assert status.pon_power == "GOOD"
+        assert status.reason_code == REASON_CONFLICTING_DATA
+        assert "pon_power lignes 2, 4" in status.block_reason
+
+    def test_long_line_keeps_line_numbers(self, tmp_path, stats_ok_file):
+        """Test : Une ligne découpée à MAX_LINE_CHARS compte pour une seule ligne"""
+        content = stats_ok_file.read_text()
+        first, _, rest = content.partition("\n")
+        long_line = f"{first}{'x' * 9000}\n"
+        stats = tmp_path / "stats_long.txt"
+        stats.write_text(long_line + rest)
+
+        status = PortChecker(stats, validate=True).check()
+        assert status.report.provenance["pon_power"] == (2, len(long_line))
+        with open(stats, "rb") as f:
+            f.seek(status.report.provenance["slice_status"][1])
+            assert b"Slice: ONLINE" in f.readline()
+
+        archive = tmp_path / "stats.tar"
+        with tarfile.open(archive, "w") as tar:
+            tar.add(stats, arcname="long.txt")
+        member = dict(iter_archive(archive, validate=True))["long.txt"]
+        assert member.report.provenance == status.report.provenance
+
+    def test_fast_rejection(self):
+        """Test : Une entrée sans stats est rejetée sans être lue en entier"""
+        consumed = []
+
+        def lines():
+            for number in range(100000):
+                consumed.append(number)
+                yield f"{number}\n"
+
+        status = parse_lines_validated(lines())
+        assert status.reason_code == REASON_NOT_STATS
+        assert status.can_restart is False
+        assert len(consumed) <= 100
+
+    def test_binary_file_rejected(self, tmp_path):
+        """Test : Un fichier binaire est rejeté au lieu de lever une erreur"""
+        binary = tmp_path / "dump.bin"
+        binary.write_bytes(bytes(range(256)) * 4096)
+        status = PortChecker(binary, validate=True).check()
+        assert status.reason_code == REASON_NOT_STATS
+
+    def test_validated_archive(self, tmp_path, fixtures_dir):
+        """Test : La validation s'applique aussi aux membres d'une archive"""
+        archive = tmp_path / "stats.tar"
+        empty = tmp_path / "vide.txt"
+        empty.write_text("")
+        with tarfile.open(archive, "w") as tar:
+            tar.add(fixtures_dir / "stats_ok.txt", arcname="ok.txt")
+            tar.add(empty, arcname="vide.txt")
+
+        results = dict(iter_archive(archive, validate=True))
+        assert results["ok.txt"].can_restart is True
+        assert results["vide.txt"].reason_code == REASON_NOT_STATS
@@ -0,0 +1,115 @@
+"""
+Tests du simulateur : génération du parc, faux oltchiprzt.pl et test de charge
+"""
+
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from simulator.generator import (
+    PROFILE_OFFLINE,
+    PROFILE_OK,
+    PROFILE_PON_FAIL,
+    PROFILE_RATIO_LOW,
+    generate_fleet,
+    read_expected,
+)
+from src.port_checker import PortChecker
+
+PROJECT_ROOT = Path(__file__).parent.parent
+FAKE_RESTART = PROJECT_ROOT / "simulator" / "fake_oltchiprzt.py"
+
+
+@pytest.fixture
+def fleet_csv(tmp_path):
+    """Parc de 4 OLT × 250 ports avec des proportions élevées de blocages"""
+    return generate_fleet(tmp_path / "parc", 4, 250, pon_fail=0.1, ratio_low=0.2, offline=0.1, seed=42)
+
+
+class TestGenerator:
+    """Tests de la génération du parc"""
+
+    def test_fleet_layout(self, fleet_csv):
+        """Test : Un fichier de stats par port et un CSV lisible par --batch"""
+        expected = read_expected(fleet_csv)
+        assert len(expected) == 1000
+        assert ("olt-sim-0001", "1/1/1") in expected
+        assert ("olt-sim-0004", "1/16/10") in expected
+        assert len(list((fleet_csv.parent / "stats").rglob("*.txt"))) == 1000
+
+    def test_distribution(self, fleet_csv):
+        """Test : Les proportions demandées doivent être respectées"""
+        codes = list(read_expected(fleet_csv).values())
+        assert 60 < codes.count(PROFILE_PON_FAIL) < 140
+        assert 150 < codes.count(PROFILE_RATIO_LOW) < 250
+        assert 60 < codes.count(PROFILE_OFFLINE) < 140
+        assert codes.count(PROFILE_OK) > 500
+
+    def test_decisions_match_expected(self, fleet_csv):
+        """Test : PortChecker doit retrouver le profil de chaque port généré"""
+        import csv
+
+        with open(fleet_csv, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                assert PortChecker(row["stats_file"]).check().reason_code == int(row["expected"])
+
+    def test_same_seed_same_fleet(self, tmp_path):
+        """Test : Une même graine doit produire le même parc"""
+        first = generate_fleet(tmp_path / "a", 1, 50, seed=7)
+        second = generate_fleet(tmp_path / "b", 1, 50, seed=7)
+        assert read_expected(first) == read_expected(second)
+
+    def test_invalid_proportions(self, tmp_path):
+        """Test : Des proportions de somme > 1 doivent être refusées"""
+        with pytest.raises(ValueError):
+            generate_fleet(tmp_path, 1, 1, pon_fail=0.6, ratio_low=0.6)
+
+
+class TestFakeRestart:
+    """Tests du faux oltchiprzt.pl"""
+
+    def run_fake(self, *options):
+        return subprocess.run(
+            [sys.executable, str(FAKE_RESTART), *options, "-h", "olt-a", "-p", "1/1/1"],
+            capture_output=True,
+            text=True,
+        )
+
+    def test_success_is_logged(self, tmp_path):
+        """Test : Un redémarrage réussi retourne 0 et est journalisé"""
+        log = tmp_path / "calls.log"
+        cmd = self.run_fake("--latency", "0.01", "--log", str(log))
+        assert cmd.returncode == 0
+        assert "Port redemarre" in cmd.stdout
+        olt, port, rc, elapsed = log.read_text().split()
+        assert (olt, port, rc) == ("olt-a", "1/1/1", "0")
+        assert float(elapsed) >= 0.01
+
+    def test_failure_rate(self):
+        """Test : Un taux d'échec de 1 doit toujours échouer"""
+        assert self.run_fake("--failure-rate", "1").returncode != 0
+
+
+class TestLoadTest:
+    """Tests du test de charge"""
+
+    def test_small_loadtest(self, fleet_csv):
+        """Test : Le test de charge ne doit trouver aucun écart de décision"""
+        cmd = subprocess.run(
+            [sys.executable, "-m", "simulator.loadtest", "--fleet", str(fleet_csv),
+             "--workers", "2", "--latency", "0", "--restart-limit", "5"],
+            cwd=PROJECT_ROOT,
+            capture_output=True,
+            text=True,
+        )
+        assert cmd.returncode == 0, cmd.stderr
+        report = json.loads(cmd.stdout)
+        assert report["fleet"]["ports"] == 1000
+        assert report["checker"]["mismatches"] == 0
+        assert report["batch"]["mismatches"] == 0
+        assert report["batch"]["cli_calls"] == 4
+        assert report["restart"]["ports"] == 5
+        assert report["restart"]["failed"] == 0
@@ -0,0 +1,269 @@
+"""
+Tests de context_2/traiter.py : sources, historique, dédoublonnage et agrégats
+"""
+
+import glob
+import importlib.util
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+pd = pytest.importorskip("pandas")
+np = pytest.importorskip("numpy")
+
+TRAITER = Path(__file__).parent.parent / "context_2" / "traiter.py"
+
+ENTETE = "timestamp,bandwidth_mbps,latency_ms,packet_loss\n"
+MESURES = (
+    "2025-07-02 10:00:00,90,150,0.02\n"
+    "2025-07-02 10:05:00,95,210,0.01\n"
+    "2025-07-02 10:10:00,5,180,0.05\n"
+    "2025-07-02 10:15:00,92,180,8.5\n"
+)
+
+
+@pytest.fixture
+def traiter(tmp_path, monkeypatch):
+    """Module traiter.py chargé avec tmp_path comme dossier de travail"""
+    monkeypatch.chdir(tmp_path)
+    spec = importlib.util.spec_from_file_location("traiter", TRAITER)
+    module = importlib.util.module_from_spec(spec)
+    # Enregistré pour que les processus de traitement retrouvent ses fonctions
+    monkeypatch.setitem(sys.modules, "traiter", module)
+    spec.loader.exec_module(module)
+    return module
+
+
+def ecrire(chemin, contenu):
+    """Écrit un fichier de mesures (dossiers créés au besoin)"""
+    chemin = Path(chemin)
+    chemin.parent.mkdir(parents=True, exist_ok=True)
+    chemin.write_text(contenu, encoding="utf-8")
+    return str(chemin)
+
+
+class TestSources:
+    """Tests du nom de source"""
+
+    @pytest.mark.parametrize("fichier, source", [
+        ("paris.csv", "paris"),
+        ("sondes/paris_2025070210.csv", "paris"),
+        ("paris_2025-07-02_10.csv.gz", "paris"),
+        ("lyon-01.csv", "lyon-01"),
+    ])
+    def test_motif_par_defaut(self, traiter, fichier, source):
+        """Test : Le suffixe horaire des fichiers horaires est retiré"""
+        assert traiter.source_de(fichier) == source
+
+    def test_motif_dossier(self, traiter):
+        """Test : Un motif peut prendre la source dans le dossier"""
+        motif = r"(?P<source>[^/]+)/[^/]+$"
+        assert traiter.source_de("a/site.csv", motif) == "a"
+        assert traiter.source_de("b/site.csv", motif) == "b"
+
+
+class TestHistorique:
+    """Tests de l'historique donnees_propres.csv"""
+
+    def test_entete_sans_source_migre(self, traiter, tmp_path):
+        """Test : Un historique à 4 colonnes est migré avant l'ajout de lignes"""
+        ecrire(tmp_path / traiter.FICHIER_CSV, ENTETE + MESURES)
+        # Colonnes dans un autre ordre que l'historique
+        fichier = ecrire(tmp_path / "site2.csv",
+                         "bandwidth_mbps,timestamp,latency_ms,packet_loss\n"
+                         "50,2025-07-02 11:00:00,100,0.1\n")
+
+        traiter.traiter_fichiers([fichier], workers=1)
+
+        historique = pd.read_csv(tmp_path / traiter.FICHIER_CSV)
+        assert list(historique.columns) == [
+            "timestamp", "bandwidth_mbps", "latency_ms", "packet_loss", "source"
+        ]
+        assert list(historique["source"]) == [traiter.SOURCE_HISTORIQUE] * 4 + ["site2"]
+        assert historique.iloc[-1]["timestamp"] == "2025-07-02 11:00:00"
+        assert historique.iloc[-1]["bandwidth_mbps"] == 50
+
+    def test_reconstruction_apres_mise_a_jour(self, traiter, tmp_path):
+        """Test : --reconstruire-index et --reconstruire-rollups migrent l'historique"""
+        ecrire(tmp_path / traiter.FICHIER_CSV, ENTETE + MESURES)
+        cmd = subprocess.run(
+            [sys.executable, str(TRAITER), "--reconstruire-index", "--reconstruire-rollups"],
+            cwd=tmp_path,
+            capture_output=True,
+            text=True,
+        )
+        assert cmd.returncode == 0, cmd.stderr
+
+        cles = traiter.cles_lignes(pd.read_csv(traiter.FICHIER_CSV))
+        assert traiter.deja_vues(cles).all()
+        assert (tmp_path / "rollup_1h" / "2025-07-02.csv").exists()
+
+
+class TestDedoublonnage:
+    """Tests de l'index des lignes déjà sauvegardées"""
+
+    def test_deux_executions_sans_nouvelle_ligne(self, traiter, tmp_path):
+        """Test : Relancer sur le même fichier n'ajoute ni ligne ni alerte"""
+        fichier = ecrire(tmp_path / "paris.csv", ENTETE + MESURES)
+        traiter.traiter_fichiers([fichier], workers=1)
+        historique = (tmp_path / traiter.FICHIER_CSV).read_text(encoding="utf-8")
+        alertes = (tmp_path / traiter.FICHIER_LOG).read_text(encoding="utf-8").count("ALERTE")
+
+        traiter.traiter_fichiers([fichier], workers=1)
+
+        assert (tmp_path / traiter.FICHIER_CSV).read_text(encoding="utf-8") == historique
+        assert (tmp_path / traiter.FICHIER_LOG).read_text(encoding="utf-8").count("ALERTE") == alertes == 3
+        resume = pd.read_csv(tmp_path / traiter.FICHIER_RESUME)
+        assert resume.loc[0, "lignes_propres"] == 0
+        assert resume.loc[0, "anomalies"] == 0
+
+    def test_doublons_du_lot(self, traiter, tmp_path):
+        """Test : Une ligne présente dans deux fichiers du lot n'est alertée qu'une fois"""
+        fichiers = [ecrire(tmp_path / dossier / "site.csv", ENTETE + MESURES) for dossier in "ab"]
+
+        traiter.traiter_fichiers(fichiers, workers=2)
+
+        assert len(pd.read_csv(tmp_path / traiter.FICHIER_CSV)) == 4
+        assert (tmp_path / traiter.FICHIER_LOG).read_text(encoding="utf-8").count("ALERTE") == 3
+        resume = pd.read_csv(tmp_path / traiter.FICHIER_RESUME).iloc[0]
+        assert (resume["fichiers"], resume["lignes_lues"]) == (2, 8)
+        assert (resume["lignes_propres"], resume["anomalies"]) == (4, 3)
+
+    def test_ecritures_proportionnelles_aux_nouvelles_cles(self, traiter):
+        """Test : Ajouter quelques clés ne réécrit pas les grands niveaux"""
+        rng = np.random.default_rng(0)
+        historique = np.unique(rng.integers(0, 2**63, 50_000, dtype=np.uint64))
+        traiter.enregistrer_cles(historique)
+        grand = traiter.niveaux_index()[0]
+        inode = Path(grand).stat().st_ino
+
+        ajouts = []
+        for _ in range(20):
+            cles = rng.integers(0, 2**63, 10, dtype=np.uint64)
+            traiter.enregistrer_cles(cles[~traiter.deja_vues(cles)])
+            ajouts.append(cles)
+
+        assert Path(grand).stat().st_ino == inode
+        assert len(traiter.niveaux_index()) <= 8
+        assert traiter.deja_vues(np.concatenate([historique, *ajouts])).all()
+        assert not traiter.deja_vues(rng.integers(0, 2**63, 1000, dtype=np.uint64)).any()
+
+    def test_fusion_par_blocs(self, traiter, tmp_path):
+        """Test : La fusion par petits blocs donne l'union triée des niveaux"""
+        rng = np.random.default_rng(1)
+        a = np.unique(rng.integers(0, 2**64 - 1, 5000, dtype=np.uint64))
+        b = np.unique(rng.integers(0, 2**64 - 1, 3000, dtype=np.uint64))
+        ancien, recent = tmp_path / "ancien.u64", tmp_path / "recent.u64"
+        a.astype(traiter.TYPE_CLE).tofile(ancien)
+        b.astype(traiter.TYPE_CLE).tofile(recent)
+
+        traiter.fusionner_niveaux(str(ancien), str(recent), taille_bloc=64)
+
+        assert not recent.exists()
+        np.testing.assert_array_equal(traiter.charger_niveau(str(ancien)), np.union1d(a, b))
+
+
+def lire_rollup(dossier):
+    """Table d'agrégats complète (tous les fichiers journaliers)"""
+    rollup = pd.concat(map(pd.read_csv, sorted(glob.glob(f"{dossier}/*.csv"))))
+    return rollup.sort_values(["source", "timestamp"]).reset_index(drop=True)
+
+
+class TestRollups:
+    """Tests des agrégats incrémentaux"""
+
+    def test_fusion_egale_recalcul(self, traiter, tmp_path):
+        """Test : Agrégats fusionnés lot par lot = recalcul complet (hors p95)"""
+        lignes = [
+            f"2025-07-0{1 + i // 40} {i % 24:02d}:{(7 * i) % 60:02d}:00,"
+            f"{10 + i % 90},{100 + (13 * i) % 150},{(i % 7) / 2}\n"
+            for i in range(120)
+        ]
+        for numero in range(3):
+            fichier = ecrire(tmp_path / f"site_{numero}.csv",
+                             ENTETE + "".join(lignes[numero::3]))
+            traiter.traiter_fichiers([fichier], workers=1)
+        assert sorted(p.name for p in (tmp_path / "rollup_1h").iterdir()) == [
+            "2025-07-01.csv", "2025-07-02.csv", "2025-07-03.csv"
+        ]
+        incremental = {dossier: lire_rollup(dossier) for dossier in traiter.ROLLUPS.values()}
+
+        traiter.mettre_a_jour_rollups(pd.read_csv(traiter.FICHIER_CSV), reconstruire=True)
+        for dossier, table in incremental.items():
+            exact = lire_rollup(dossier)
+            colonnes = [c for c in exact.columns if c != "latency_p95"]
+            pd.testing.assert_frame_equal(table[colonnes], exact[colonnes], check_exact=False)
+            assert (table["latency_p95"] >= exact["latency_p95"] - 1e-9).all()
+
+    def test_seuls_les_jours_touches(self, traiter, tmp_path):
+        """Test : Une exécution ne réécrit que les fichiers des jours touchés"""
+        traiter.traiter_fichiers([ecrire(tmp_path / "paris.csv", ENTETE + MESURES)], workers=1)
+        ancien = tmp_path / "rollup_1h" / "2025-07-02.csv"
+        # Un fichier réécrit est remplacé par renommage : nouvel inode
+        inode = ancien.stat().st_ino
+
+        traiter.traiter_fichiers([ecrire(tmp_path / "paris_2025070310.csv",
+                                         ENTETE + "2025-07-03 10:00:00,90,150,0.02\n")], workers=1)
+
+        assert ancien.stat().st_ino == inode
+        assert (tmp_path / "rollup_1h" / "2025-07-03.csv").exists()
+
+
+class TestMetriques:
+    """Tests du fichier metriques_sondes.prom"""
+
+    def precedent(self, traiter, tmp_path, mises_a_jour):
+        """Fichier de métriques d'une exécution précédente"""
+        lignes = ["# TYPE probe_latency_ms gauge"]
+        lignes += [f'probe_latency_ms{{source="{source}"}} 150' for source in mises_a_jour]
+        lignes += ["# TYPE probe_last_update_timestamp_seconds gauge"]
+        lignes += [f'probe_last_update_timestamp_seconds{{source="{source}"}} {horodatage}'
+                   for source, horodatage in mises_a_jour.items()]
+        ecrire(tmp_path / traiter.FICHIER_METRIQUES, "\n".join(lignes) + "\n")
+
+    def sources_publiees(self, traiter, tmp_path):
+        """Sources qui publient probe_latency_ms"""
+        texte = (tmp_path / traiter.FICHIER_METRIQUES).read_text(encoding="utf-8")
+        return {ligne.split('"')[1] for ligne in texte.splitlines()
+                if ligne.startswith("probe_latency_ms{")}
+
+    def test_sources_expirees(self, traiter, tmp_path):
+        """Test : Les sources non mises à jour depuis DUREE_VIE_METRIQUES disparaissent"""
+        maintenant = time.time()
+        self.precedent(traiter, tmp_path, {
+            "lyon": maintenant - 60,
+            "nice": maintenant - traiter.DUREE_VIE_METRIQUES - 60,
+        })
+
+        traiter.traiter_fichiers([ecrire(tmp_path / "paris.csv", ENTETE + MESURES)], workers=1)
+
+        assert self.sources_publiees(traiter, tmp_path) == {"paris", "lyon"}
+
+    def test_nombre_de_sources_borne(self, traiter, tmp_path, monkeypatch):
+        """Test : Au plus MAX_SOURCES_METRIQUES sources reprises, les plus récentes"""
+        monkeypatch.setattr(traiter, "MAX_SOURCES_METRIQUES", 2)
+        maintenant = time.time()
+        self.precedent(traiter, tmp_path, {f"site{i}": maintenant - 60 * i for i in range(5)})
+
+        traiter.traiter_fichiers([ecrire(tmp_path / "paris.csv", ENTETE + MESURES)], workers=1)
+
+        assert self.sources_publiees(traiter, tmp_path) == {"paris", "site0", "site1"}
+
+    def test_relance_sans_nouvelle_ligne(self, traiter, tmp_path):
+        """Test : Un fichier renvoyé garde la dernière mesure de sa source"""
+        fichier = ecrire(tmp_path / "paris_2025070210.csv", ENTETE + MESURES)
+        traiter.traiter_fichiers([fichier], workers=1)
+        avant = (tmp_path / traiter.FICHIER_METRIQUES).read_text(encoding="utf-8")
+
+        traiter.traiter_fichiers([fichier], workers=1)
+
+        apres = (tmp_path / traiter.FICHIER_METRIQUES).read_text(encoding="utf-8")
+        for nom in traiter.FAMILLES_MESURES:
+            lignes = [l for l in apres.splitlines() if l.startswith(nom + "{")]
+            assert lignes == [l for l in avant.splitlines() if l.startswith(nom + "{")]
+            assert len(lignes) == 1
+        assert 'probe_latency_ms{source="paris"} 180' in apres
+        assert 'probe_rows_clean{source="paris"} 0' in apres